@@ -22,11 +22,19 @@ from .app.utils import logger
 from .app.config import app_config
 from .app.api.system import api_system
 from .app.api.llm import api_llm
-from .app.api.asr import router as asr
-from .app.api.vpr import router as vpr
-from .app.api.ws import router as ws
 from .app.models import response
 
+
+def __getattr__(name):
+    # STT 路由依赖 torch 等重量级库，首次访问时再导入
+    if name in ("asr", "vpr", "ws"):
+        import importlib
+        router = importlib.import_module(f".app.api.{name}", __name__).router
+        globals()[name] = router
+        return router
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     'app',
     'core', 'models', 'services', 'utils', 'config', 'api',
@@ -1,11 +1,27 @@
 # app/api 包初始化
 
-from .asr import router as asr_router
-from .vpr import router as vpr_router
-from .ws import router as ws_router
+import importlib
+
 from .system import api_system
 from .llm import api_llm
 
+# STT 相关路由（asr/vpr/ws）会连带加载 torch 等重量级依赖，按需延迟导入
+_LAZY_ROUTERS = {
+    "asr_router": "asr",
+    "vpr_router": "vpr",
+    "ws_router": "ws",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ROUTERS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    router = importlib.import_module(f".{module_name}", __name__).router
+    globals()[name] = router
+    return router
+
+
 __all__ = [
     "asr_router",
     "vpr_router", 
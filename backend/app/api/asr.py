@@ -6,6 +6,7 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Dict, Any
 
+from ..core.stt_security import verify_api_key
 from ..models.stt import AudioRecognitionRequest, AudioRecognitionResponse
 from ..services.asr_service import get_asr_service
 from ..services.vpr_service import get_vpr_service
@@ -14,7 +15,7 @@ from ..services.vpr_service import get_vpr_service
 logger = logging.getLogger("asr_api")
 
 # 创建路由
-router = APIRouter(prefix="/asr", tags=["语音识别"])
+router = APIRouter(prefix="/asr", tags=["语音识别"], dependencies=[Depends(verify_api_key)])
 
 
 @router.post("/recognize", response_model=AudioRecognitionResponse, summary="语音识别")
@@ -6,6 +6,7 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Dict, Any, List
 
+from ..core.stt_security import verify_api_key
 from ..models.stt import (
     VoiceprintRegistrationRequest, VoiceprintRegistrationResponse,
     VoiceprintCompareRequest, VoiceprintCompareResponse,
@@ -19,7 +20,7 @@ from ..services.vpr_service import get_vpr_service
 logger = logging.getLogger("vpr_api")
 
 # 创建路由
-router = APIRouter(prefix="/vpr", tags=["声纹识别"])
+router = APIRouter(prefix="/vpr", tags=["声纹识别"], dependencies=[Depends(verify_api_key)])
 
 
 @router.post("/register", response_model=VoiceprintRegistrationResponse, summary="注册声纹")
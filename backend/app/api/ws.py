@@ -3,26 +3,25 @@ WebSocket API路由 - 仅实时语音聊天
 """
 
 import logging
-import json
 import base64
 import asyncio
-from typing import Dict, Any, List
-from pathlib import Path
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from typing import Dict, Any, Set
+
+import orjson
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
 from ..services.asr_service import get_asr_service
+from ..core.stt_security import verify_websocket_api_key
 
 
 from ..core.pipeline.chat_process import chat_process
 
-# 项目根目录
-ROOT_DIR = Path(__file__).parent.parent.parent
-
 
 # 配置日志
 logger = logging.getLogger("ws_api")
 
 # 创建路由
-router = APIRouter(tags=["WebSocket - 实时语音聊天"])
+# 与 /stt/asr、/stt/vpr 使用同一鉴权配置，握手时校验，避免经由 WebSocket 绕过鉴权
+router = APIRouter(tags=["WebSocket - 实时语音聊天"], dependencies=[Depends(verify_websocket_api_key)])
 
 
 class ConnectionManager:
@@ -30,7 +29,8 @@ class ConnectionManager:
 
     def __init__(self):
         """初始化连接管理器"""
-        self.active_connections: List[WebSocket] = []
+        # 使用集合保存连接，加入/移除与成员判断均为 O(1)
+        self.active_connections: Set[WebSocket] = set()
 
     async def connect(self, websocket: WebSocket):
         """建立WebSocket连接
@@ -39,7 +39,7 @@ class ConnectionManager:
             websocket: WebSocket连接
         """
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
         logger.info(f"WebSocket连接建立，当前连接数: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket):
@@ -49,7 +49,7 @@ class ConnectionManager:
             websocket: WebSocket连接
         """
         if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+            self.active_connections.discard(websocket)
             logger.info(f"WebSocket连接断开，当前连接数: {len(self.active_connections)}")
 
     async def send_json(self, websocket: WebSocket, data: Dict[str, Any]):
@@ -60,7 +60,8 @@ class ConnectionManager:
             data: 要发送的数据
         """
         try:
-            await websocket.send_json(data)
+            # 使用 orjson 序列化（C 实现），比 Starlette 默认的 json.dumps 更快
+            await websocket.send_text(orjson.dumps(data).decode("utf-8"))
         except Exception as e:
             logger.error(f"发送WebSocket消息失败: {e}")
             # 移除失效的连接
@@ -111,7 +112,7 @@ async def realtime_chat_websocket_endpoint(websocket: WebSocket):
 
             try:
                 # 解析JSON消息
-                message = json.loads(data)
+                message = orjson.loads(data)
                 action = message.get("action", "")
 
                 if action == "config":
@@ -175,93 +176,46 @@ async def realtime_chat_websocket_endpoint(websocket: WebSocket):
                         if recognized_text.strip():
                             logger.info("STT成功，开始自动调用Pipeline...")
 
-                            # 创建模拟的UploadFile对象用于pipeline处理
-                            from io import BytesIO
-                            from fastapi import UploadFile
-
-                            # 创建BytesIO对象包装音频数据
-                            audio_buffer = BytesIO(audio_data)
-                            audio_buffer.seek(0)
-
-                            # 创建UploadFile对象
-                            audio_file = UploadFile(
-                                filename="audio_input.wav",
-                                file=audio_buffer
-                            )
-
-                            response = await chat_process.handle_request(
-                                model=session_state["model"],
-                                message=recognized_text,  # 使用STT识别的文本
-                                role="user",
-                                stream=session_state["stream"],
-                                stt=False,  # STT已经完成，不需要再做
-                                tts=session_state["tts"],  # 启用TTS
-                                audio_file=None,  # 不传递音频文件，因为已经有了文本
-                                user_id=session_state["user_id"]
-                            )
-
-                            # 处理pipeline响应
-                            if session_state["stream"] and hasattr(response, 'body_iterator'):
-                                # 流式响应处理
-                                async for chunk in response.body_iterator:
-                                    if chunk:
-                                        chunk_str = chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
-                                        # 解析SSE格式的数据
-                                        if chunk_str.startswith('data: '):
-                                            data_content = chunk_str[6:].strip()
-                                            if data_content == '[DONE]':
-                                                # 流式响应完成，发送complete消息并清除处理状态
-                                                await manager.send_json(websocket, {
-                                                    "success": True,
-                                                    "type": "complete",
-                                                    "message": "流式Pipeline处理完成"
-                                                })
-                                                logger.info("流式Pipeline处理完成")
-                                                break
-                                            try:
-                                                chunk_data = json.loads(data_content)
-                                                # 检查是否包含音频数据
-                                                if 'audio' in chunk_data:
-                                                    # 发送音频数据作为二进制
-                                                    audio_bytes = base64.b64decode(chunk_data['audio'])
-                                                    await websocket.send_bytes(audio_bytes)
-                                                else:
-                                                    # 发送其他数据作为JSON
-                                                    await manager.send_json(websocket, {
-                                                        "success": True,
-                                                        "type": "stream_chunk",
-                                                        "data": chunk_data
-                                                    })
-                                            except json.JSONDecodeError:
-                                                continue
-                            elif session_state["stream"] and hasattr(response, '__aiter__'):
-                                # 处理异步生成器
-                                async for chunk in response:
-                                    if chunk:
-                                        chunk_str = chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
-                                        # 解析SSE格式的数据
-                                        if chunk_str.startswith('data: '):
-                                            data_content = chunk_str[6:].strip()
-                                            if data_content == '[DONE]':
-                                                # 流式响应完成，发送complete消息并清除处理状态
-                                                await manager.send_json(websocket, {
-                                                    "success": True,
-                                                    "type": "complete",
-                                                    "message": "流式Pipeline处理完成"
-                                                })
-                                                logger.info("流式Pipeline处理完成")
-                                                break
-                                            try:
-                                                chunk_data = json.loads(data_content)
-                                                # 发送给客户端
-                                                await manager.send_json(websocket, {
-                                                    "success": True,
-                                                    "type": "stream_chunk",
-                                                    "data": chunk_data
-                                                })
-                                            except json.JSONDecodeError:
-                                                continue
+                            if session_state["stream"]:
+                                # 流式处理：直接消费流水线事件，音频以原始字节下发，
+                                # 省去 SSE 编码与 Base64 编码/解码的往返
+                                async for kind, value in chat_process.stream_chat(
+                                    model=session_state["model"],
+                                    message=recognized_text,  # 使用STT识别的文本
+                                    role="user",
+                                    tts=session_state["tts"],
+                                    user_id=session_state["user_id"],
+                                ):
+                                    if kind == "audio":
+                                        # 发送音频数据作为二进制
+                                        await websocket.send_bytes(value)
+                                    else:
+                                        # 发送其他数据作为JSON
+                                        await manager.send_json(websocket, {
+                                            "success": True,
+                                            "type": "stream_chunk",
+                                            "data": {kind: value}
+                                        })
+
+                                # 流式响应完成，发送complete消息
+                                await manager.send_json(websocket, {
+                                    "success": True,
+                                    "type": "complete",
+                                    "message": "流式Pipeline处理完成"
+                                })
+                                logger.info("流式Pipeline处理完成")
                             else:
+                                response = await chat_process.handle_request(
+                                    model=session_state["model"],
+                                    message=recognized_text,  # 使用STT识别的文本
+                                    role="user",
+                                    stream=False,
+                                    stt=False,  # STT已经完成，不需要再做
+                                    tts=session_state["tts"],  # 启用TTS
+                                    audio_file=None,  # 不传递音频文件，因为已经有了文本
+                                    user_id=session_state["user_id"]
+                                )
+
                                 # 非流式响应
                                 await manager.send_json(websocket, {
                                     "success": True,
@@ -300,7 +254,7 @@ async def realtime_chat_websocket_endpoint(websocket: WebSocket):
                         "error": f"不支持的动作: {action}"
                     })
 
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 await manager.send_json(websocket, {
                     "success": False,
                     "error": "无效的JSON消息"
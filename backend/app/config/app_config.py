@@ -3,7 +3,8 @@ app/config/app_config.py
 应用全局配置管理模块。
 """
 
-from typing import Any
+from functools import lru_cache
+from typing import Any, Dict
 from loguru import logger
 
 from .default import DEFAULT_CONFIG
@@ -36,3 +37,25 @@ class AppConfig(dict):
 
     def __setattr__(self, key: str, value: Any) -> None:
         self[key] = value
+
+
+@lru_cache(maxsize=1)
+def get_stt_settings() -> Dict[str, Any]:
+    """获取STT配置（进程内只解析一次，配置变更后可调用 get_stt_settings.cache_clear()）"""
+    try:
+        from .. import app_config
+        return app_config.get("stt", {})
+    except Exception as e:
+        logger.warning(f"无法加载后端配置，使用空配置: {e}")
+        return {}
+
+
+@lru_cache(maxsize=1)
+def get_vad_settings() -> Dict[str, Any]:
+    """获取VAD配置（进程内只解析一次）"""
+    try:
+        from .. import app_config
+        return app_config.get("vad", {})
+    except Exception as e:
+        logger.warning(f"无法加载VAD配置: {e}")
+        return {}
@@ -6,7 +6,12 @@ app/config/constant.py
 """
 
 import os
+from pathlib import Path
 
+# 项目根目录（backend 目录），在导入时解析一次，各模块共享
+ROOT_DIR = Path(__file__).resolve().parents[2]
+# 配置文件路径
+CONFIG_FILE = ROOT_DIR / "config.json"
 
 DEFAULT_VALUE_MAP = {
     "int": 0,
@@ -5,32 +5,128 @@ app/config/default.py
 - 从 config.json 文件读取配置，支持类型转换和参数化配置。
 """
 
+import mmap
 import os
 import sys
-import json
-from typing import Optional, TypeVar, Type
-from pathlib import Path
+import pickle
+import struct
+import threading
+from typing import Optional, Tuple, TypeVar, Type
+from types import MappingProxyType
 
-# 项目根目录
-ROOT_DIR = Path(__file__).parent.parent.parent
+import orjson
+
+from .constant import CONFIG_FILE, ROOT_DIR
 
 _T = TypeVar("_T")
 
+# 已解析的 config.json 内容（首次读取后缓存，避免每个配置项都重新读取并解析文件）
+_config_data: Optional[dict] = None
+# 保证并发首次加载时只解析、写快照一次
+_config_lock = threading.Lock()
+
+# config.json 的二进制快照，跨进程复用解析结果
+# 文件格式：魔数 + 格式版本 + config.json 的 (mtime_ns, size) + 数据长度，其后为 pickle 数据
+CONFIG_SNAPSHOT_FILE = ROOT_DIR / ".config.cache.pkl"
+_SNAPSHOT_MAGIC = b"VXCF"
+_SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct("<4sHqqQ")
+
+# config.json 超过该大小时使用 mmap 读取
+_MMAP_THRESHOLD = 64 * 1024
+
+
+def _read_config_snapshot(key: Tuple[int, int]) -> Optional[dict]:
+    """读取与 config.json 当前状态一致的快照，不存在、已过期或格式不符时返回 None"""
+    try:
+        with open(CONFIG_SNAPSHOT_FILE, "rb") as f:
+            header = f.read(_SNAPSHOT_HEADER.size)
+            if len(header) != _SNAPSHOT_HEADER.size:
+                return None
+            magic, version, mtime_ns, size, length = _SNAPSHOT_HEADER.unpack(header)
+            if magic != _SNAPSHOT_MAGIC or version != _SNAPSHOT_VERSION or (mtime_ns, size) != key:
+                return None
+            payload = f.read(length)
+    except OSError:
+        return None
+    if len(payload) != length:
+        return None
+    try:
+        config = pickle.loads(payload)
+    except (pickle.UnpicklingError, EOFError):
+        return None
+    return config if isinstance(config, dict) else None
+
+
+def _write_config_snapshot(key: Tuple[int, int], config: dict) -> None:
+    """写入快照（先写临时文件再原子替换），失败时忽略"""
+    payload = pickle.dumps(config, protocol=pickle.HIGHEST_PROTOCOL)
+    header = _SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, key[0], key[1], len(payload))
+    tmp_file = CONFIG_SNAPSHOT_FILE.with_name(f"{CONFIG_SNAPSHOT_FILE.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_file, "wb") as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp_file, CONFIG_SNAPSHOT_FILE)
+    except OSError:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+
+
+def load_config_file() -> dict:
+    """读取并解析 config.json，结果在进程内缓存"""
+    global _config_data
+    if _config_data is not None:
+        return _config_data
+
+    with _config_lock:
+        if _config_data is None:
+            _config_data = _load_config_file()
+    return _config_data
+
+
+def _parse_config_file(size: int) -> dict:
+    """解析 config.json；较大的文件通过 mmap 直接交给 orjson，避免先整体读入内存再解析"""
+    with open(CONFIG_FILE, "rb") as f:
+        if size >= _MMAP_THRESHOLD:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m, memoryview(m) as view:
+                    return orjson.loads(view)
+            except (OSError, ValueError):
+                # 部分平台/文件系统不支持 mmap，退回普通读取
+                f.seek(0)
+        return orjson.loads(f.read())
+
+
+def _load_config_file() -> dict:
+    """实际读取 config.json（优先使用快照），调用方负责加锁"""
+    if not CONFIG_FILE.is_file():
+        return {}
+
+    try:
+        stat = CONFIG_FILE.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        config = _read_config_snapshot(key)
+        if config is not None:
+            return config
+        config = _parse_config_file(stat.st_size)
+    except OSError as e:
+        print(f"❌ Error: Failed to read config.json: {e}")
+        return {}
+    except orjson.JSONDecodeError as e:
+        print(f"❌ Error: Failed to parse config.json: {e}")
+        return {}
+
+    _write_config_snapshot(key, config)
+    return config
+
 
 def get_config_value(key_path: str, type_: Type[_T], default: Optional[_T] = None) -> _T:
     """从 config.json 获取指定的配置值，并自动转换为指定的类型"""
-    config_file = ROOT_DIR / "config.json"
-    
-    try:
-        if config_file.exists():
-            with open(config_file, "r", encoding="utf-8") as f:
-                config = json.load(f)
-        else:
-            config = {}
-    except Exception as e:
-        print(f"❌ Error: Failed to load config.json: {e}")
-        config = {}
-    
+    config = load_config_file()
+
     # 解析 key_path，如 "openai.api_key"
     keys = key_path.split(".")
     value = config
@@ -65,8 +161,8 @@ def get_config_value(key_path: str, type_: Type[_T], default: Optional[_T] = Non
     return result
 
 
-# 配置字典
-DEFAULT_CONFIG = {
+# 配置字典（构建完成后以只读视图 DEFAULT_CONFIG 对外提供）
+_default_config = {
     "openai": {
         "api_key": get_config_value("openai.api_key", str, "sk-default-key"),
         "base_url": get_config_value("openai.base_url", str, "https://api.openai.com/v1"),
@@ -77,6 +173,8 @@ DEFAULT_CONFIG = {
     "stt": {
         "active_service": get_config_value("stt.active_service", str, "openai"),
         "openai_model": get_config_value("stt.openai_model", str, "whisper-1"),
+        "require_auth": get_config_value("stt.require_auth", bool, False),
+        "api_key": get_config_value("stt.api_key", str, ""),
     },
     "tts": {
         "active_service": get_config_value("tts.active_service", str, "edge"),
@@ -89,7 +187,12 @@ DEFAULT_CONFIG = {
         "ollama_models": get_config_value("llm.ollama_models", list, ["llama2"]),
         "custom_endpoint_base_url": get_config_value("llm.custom_endpoint_base_url", str, "http://your-custom-endpoint"),
         "custom_endpoint_models": get_config_value("llm.custom_endpoint_models", list, ["custom-model-1"]),
+        "custom_endpoint_stream_usage": get_config_value("llm.custom_endpoint_stream_usage", bool, False),
         "context_window": get_config_value("llm.context_window", int, 10),
+        "max_connections": get_config_value("llm.max_connections", int, 64),
+        "reply_cache_enabled": get_config_value("llm.reply_cache_enabled", bool, False),
+        "reply_cache_size": get_config_value("llm.reply_cache_size", int, 512),
+        "reply_cache_ttl": get_config_value("llm.reply_cache_ttl", int, 300),
     },
     "database": {
         "engine": get_config_value("database.engine", str, "sqlite"),
@@ -99,14 +202,15 @@ DEFAULT_CONFIG = {
 }
 
 # TTS服务配置
-DEFAULT_CONFIG["tts_config"] = {
+_default_config["tts_config"] = {
     "base_url": get_config_value("tts_config.base_url", str, "http://localhost:9880"),  # TTS服务的基础URL
     "default_character": get_config_value("tts_config.default_character", str, "march7"),
     "default_mood": get_config_value("tts_config.default_mood", str, "normal"),
+    "max_batch_size": get_config_value("tts_config.max_batch_size", int, 8),  # 每批最多合并的文本块数
 }
 
 # GPT-SoVITS TTS配置
-DEFAULT_CONFIG["tts"] = {
+_default_config["tts"] = {
     "gpt_sovits": {
         "default_models": {
             "sovits_path": get_config_value("default_models.sovits_path", str, "backend/GPT_SoVITS/models/SoVITS_weights_v4/March7_e10_s4750_l32.pth"),
@@ -141,13 +245,14 @@ DEFAULT_CONFIG["tts"] = {
             "default_if_freeze": get_config_value("inference.default_if_freeze", bool, False),
             "default_sample_steps": get_config_value("inference.default_sample_steps", int, 8),
             "default_if_sr": get_config_value("inference.default_if_sr", bool, False),
-            "default_pause_second": get_config_value("inference.default_pause_second", float, 0.3)
+            "default_pause_second": get_config_value("inference.default_pause_second", float, 0.3),
+            "model_cache_size": get_config_value("inference.model_cache_size", int, 2),  # 切换模型时保留在 CPU 内存中的最近使用模型数（0 表示不缓存）
         }
     }
 }
 
 # 角色配置
-DEFAULT_CONFIG["characters"] = {
+_default_config["characters"] = {
     "march7": {
         "name": "三月七",
         "default_mood": "normal",
@@ -172,7 +277,7 @@ DEFAULT_CONFIG["characters"] = {
 }
 
 # VAD配置 (fsmn-vad参数)
-DEFAULT_CONFIG["vad"] = {
+_default_config["vad"] = {
     "threshold": get_config_value("vad.threshold", float, 0.3),  # VAD阈值
     "min_speech_duration_ms": get_config_value("vad.min_speech_duration_ms", int, 100),  # 最短语音持续时间
     "max_speech_duration_s": get_config_value("vad.max_speech_duration_s", float, 30),  # 最长语音持续时间
@@ -184,7 +289,7 @@ DEFAULT_CONFIG["vad"] = {
 }
 
 # GUI配置
-DEFAULT_CONFIG["gui"] = {
+_default_config["gui"] = {
     "models": {
         "llm_models": get_config_value("gui.models.llm_models", list, ["deepseek/deepseek-v3-0324", "gpt-3.5-turbo", "gpt-4"]),
         "default_llm_model": get_config_value("gui.models.default_llm_model", str, "deepseek/deepseek-v3-0324")
@@ -202,7 +307,7 @@ DEFAULT_CONFIG["gui"] = {
 }
 
 # Live2D配置
-DEFAULT_CONFIG["live2d"] = {
+_default_config["live2d"] = {
     "default_model": get_config_value("live2d.default_model", str, "march7"),
     "model_directory": get_config_value("live2d.model_directory", str, "march7"),
     "model_file": get_config_value("live2d.model_file", str, "三月七.model3.json"),
@@ -215,3 +320,6 @@ DEFAULT_CONFIG["live2d"] = {
         }
     }
 }
+
+# 冻结顶层配置，防止调用方意外修改默认配置（需要修改时请先 dict(DEFAULT_CONFIG) 复制）
+DEFAULT_CONFIG = MappingProxyType(_default_config)
@@ -14,7 +14,7 @@ from tortoise.exceptions import OperationalError, ConfigurationError
 from loguru import logger
 
 from ...models.chat import ChatMessage
-from ..llm.message import Message, MessageComponent
+from ..llm.message import Message, MessageComponent, MessageRole, MessageSender
 from ... import app_config
 
 
@@ -34,33 +34,24 @@ class DBMessageHistory:
 
     async def _cleanup_old_messages(self):
         try:
-            all_messages = await ChatMessage.all().order_by("-timestamp")
-            if len(all_messages) > self.context_window:
-                messages_to_delete = all_messages[self.context_window:]
-                for msg in messages_to_delete:
-                    await msg.delete()
-                logger.info(f"清理了 {len(messages_to_delete)} 条超出上下文窗口的旧消息")
+            # 只查询超出窗口的消息ID，并用一条 DELETE 删除
+            stale_ids = await (
+                ChatMessage.all().order_by("-timestamp").offset(self.context_window).values_list("message_id", flat=True)
+            )
+            if stale_ids:
+                await ChatMessage.filter(message_id__in=stale_ids).delete()
+                logger.info(f"清理了 {len(stale_ids)} 条超出上下文窗口的旧消息")
         except Exception as e:
             logger.error(f"清理旧消息失败: {e}")
 
     async def add_message(self, message: Message) -> bool:
+        return await self.add_messages([message])
+
+    async def add_messages(self, messages: List[Message]) -> bool:
+        """批量写入消息（单条 INSERT），随后统一清理一次超出窗口的旧消息"""
         await self._ensure_connection()
         try:
-            components = self._process_message_components(message)
-            role_value = message.sender.role
-            if isinstance(role_value, str) and role_value.startswith("MessageRole."):
-                role_value = role_value.split(".")[-1].lower()
-            elif hasattr(role_value, "value"):
-                role_value = role_value.value
-
-            await ChatMessage.create(
-                message_id=uuid.UUID(message.message_id) if message.message_id else uuid.uuid4(),
-                role=str(role_value),
-                content=message.message_str,
-                components=components,
-                model=getattr(message.sender, 'nickname', None),
-                timestamp=message.timestamp,
-            )
+            await ChatMessage.from_llm_messages(messages)
             await self._cleanup_old_messages()
             return True
         except OperationalError as e:
@@ -71,30 +62,23 @@ class DBMessageHistory:
             traceback.print_exc()
             return False
 
-    def _process_message_components(self, message: Message) -> List[Dict[str, Any]]:
-        components = []
-        if not message.components:
-            return [{"type": "text", "content": message.message_str, "extra": None}]
-
-        for comp in message.components:
-            if hasattr(comp, "dict"):
-                comp_dict = comp.dict()
-                components.append(comp_dict)
-            else:
-                components.append(comp)
-        return components
-
     def _convert_db_component_to_message_component(self, comp_data: Dict[str, Any]) -> MessageComponent:
         comp_type = comp_data.get("type", "text")
         content = comp_data.get("content", "")
         extra = comp_data.get("extra", {})
 
-        return MessageComponent(type=comp_type, content=content, extra=extra)
+        # 数据库中的数据由本模块写入，可信，跳过 pydantic 校验
+        return MessageComponent.model_construct(type=comp_type, content=content, extra=extra)
 
     async def get_history(self) -> List[Message]:
+        return await self.get_recent_messages(self.context_window)
+
+    async def get_recent_messages(self, n: int) -> List[Message]:
+        """获取最近的 n 条消息（由数据库按时间倒序 LIMIT，返回时按时间正序排列）"""
         await self._ensure_connection()
         try:
-            messages = await ChatMessage.all().order_by("timestamp").limit(self.context_window)
+            messages = await ChatMessage.all().order_by("-timestamp").limit(n)
+            messages.reverse()
             result = []
             for msg in messages:
                 components_data = msg.message_components
@@ -103,9 +87,9 @@ class DBMessageHistory:
                     component = self._convert_db_component_to_message_component(comp_data)
                     components.append(component)
 
-                message = Message(
+                message = Message.model_construct(
                     message_id=str(msg.message_id),
-                    sender={"role": msg.role, "nickname": msg.model},
+                    sender=MessageSender.model_construct(role=MessageRole(msg.role), nickname=msg.model),
                     components=components,
                     message_str=msg.content,
                     timestamp=msg.timestamp,
@@ -8,15 +8,30 @@ from abc import ABC, abstractmethod
 from typing import AsyncGenerator, Any, Dict, List, Optional
 
 import aiohttp
-import json
-import traceback
-from pydantic import BaseModel
+import orjson
+from pydantic import BaseModel, PrivateAttr
 from loguru import logger
 
 
 class LLMMessage(BaseModel):
     role: str
     content: str
+    # 标记为可缓存的静态前缀（如系统提示词），支持的端点会启用提示词缓存
+    cache: bool = False
+    # 已序列化的请求体消息（按是否启用 cache_control 缓存），消息创建后内容不再修改
+    _payloads: Dict[bool, Dict[str, Any]] = PrivateAttr(default_factory=dict)
+
+    def to_payload(self, cache_control: bool = False) -> Dict[str, Any]:
+        """转换为请求体中的消息格式（结果会被缓存，调用方不应修改）"""
+        cache_control = cache_control and self.cache
+        payload = self._payloads.get(cache_control)
+        if payload is None:
+            if cache_control:
+                content = [{"type": "text", "text": self.content, "cache_control": {"type": "ephemeral"}}]
+            else:
+                content = self.content
+            payload = self._payloads[cache_control] = {"role": self.role, "content": content}
+        return payload
 
 
 class LLMResponse(BaseModel):
@@ -34,6 +49,10 @@ class LLMConfig(BaseModel):
     api_key: str
     base_url: str
     model_name: str
+    # 流式请求是否携带 stream_options.include_usage（部分 OpenAI 兼容服务不识别该字段会返回 400）
+    stream_usage: bool = False
+    # 单个LLM实例的最大并发连接数：流式回复在整个生成期间占用一个连接，上限即同一模型可同时进行的对话数
+    max_connections: int = 64
 
 
 class BaseLLM(ABC):
@@ -41,104 +60,121 @@ class BaseLLM(ABC):
         self.api_key = llm_config.api_key
         self.base_url = llm_config.base_url
         self.model_name = llm_config.model_name
+        self.max_connections = llm_config.max_connections
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取持久化的HTTP会话，跨请求复用连接（惰性创建）"""
+        if self._session is None or self._session.closed:
+            # 连接池上限与 LLMService 一致（llm.max_connections，默认 64），超出时新请求排队等待空闲连接
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        """关闭持久化的HTTP会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
     @abstractmethod
     async def chat_completion(self, messages: List[LLMMessage]) -> LLMResponse:
         raise NotImplementedError()
 
     @abstractmethod
-    async def chat_completion_stream(self, messages: List[LLMMessage]) -> AsyncGenerator[str, None]:
+    async def chat_completion_stream(
+        self, messages: List[LLMMessage], usage: Optional[Dict[str, Any]] = None
+    ) -> AsyncGenerator[str, None]:
+        """流式生成回复；若传入 usage 字典，流结束后会填入服务端返回的 token 用量"""
         raise NotImplementedError()
 
 
+def _log_prompt_cache_usage(model_name: str, result: Dict[str, Any]):
+    """记录提示词缓存命中情况（OpenAI: prompt_tokens_details.cached_tokens，Anthropic: cache_read_input_tokens）"""
+    usage = result.get("usage") or {}
+    cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", usage.get("cache_read_input_tokens"))
+    if cached_tokens is not None:
+        logger.debug("提示词缓存 - model: {}, prompt_tokens: {}, cached_tokens: {}", model_name, usage.get("prompt_tokens"), cached_tokens)
+
+
 class OpenAILLM(BaseLLM):
     def __init__(self, llm_config: LLMConfig):
         super().__init__(llm_config)
+        # Anthropic 模型（经 OpenAI 兼容端点）需要显式的 cache_control 标记；OpenAI 模型自动缓存公共前缀
+        model_name = self.model_name.lower()
+        self.cache_control = "claude" in model_name or model_name.startswith("anthropic/")
+        self.stream_usage = llm_config.stream_usage
 
         logger.info(f"Created OpenAI LLM instance - model: {self.model_name}, base_url: {self.base_url}")
 
     async def chat_completion(self, messages: List[LLMMessage]) -> LLMResponse:
         try:
             headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
-            payload = {"model": self.model_name, "messages": [m.dict() for m in messages], "stream": False}
-
-            logger.debug(f"OpenAI chat completion payload: {payload}")
-
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.base_url}/chat/completions", headers=headers, json=payload) as response:
-                    # 检查响应状态码
-                    response.raise_for_status()
-
-                    # 检查响应结构
-                    result = await response.json()
-                    if "choices" not in result or result["choices"] is None:
-                        raise ValueError("Required 'choices' key in API response")
-
-                    return LLMResponse(
-                        text=result["choices"][0]["message"]["content"],
-                        raw_response=result,
-                    )
+            payload = {"model": self.model_name, "messages": [m.to_payload(self.cache_control) for m in messages], "stream": False}
+
+            # 仅在 DEBUG 级别启用时才格式化整个请求体（包含全部历史消息）
+            logger.debug("OpenAI chat completion payload: {}", payload)
+
+            session = self._get_session()
+            async with session.post(f"{self.base_url}/chat/completions", headers=headers, json=payload) as response:
+                # 检查响应状态码
+                response.raise_for_status()
+
+                # 检查响应结构
+                result = await response.json(loads=orjson.loads)
+                if "choices" not in result or result["choices"] is None:
+                    raise ValueError("Required 'choices' key in API response")
+                _log_prompt_cache_usage(self.model_name, result)
+
+                return LLMResponse(
+                    text=result["choices"][0]["message"]["content"],
+                    raw_response=result,
+                )
         except Exception as e:
-            logger.error(f"OpenAI chat completion API failure: {type(e).__name__} - {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("OpenAI chat completion API failure: {} - {}", type(e).__name__, e)
             return LLMErrorResponse(reason="(OpenAI) " + str(e))
 
-    async def chat_completion_stream(self, messages: List[LLMMessage]) -> AsyncGenerator[str, None]:
+    async def chat_completion_stream(
+        self, messages: List[LLMMessage], usage: Optional[Dict[str, Any]] = None
+    ) -> AsyncGenerator[str, None]:
         try:
             headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
-            payload = {"model": self.model_name, "messages": [m.dict() for m in messages], "stream": True}
-
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.base_url}/chat/completions", headers=headers, json=payload) as response:
-                    # 检查响应状态码
-                    response.raise_for_status()
-
-                    # 调试第一块原始响应
-                    first_chunk = await response.content.readany()
-                    first_text = first_chunk.decode("utf-8", errors="replace")
-
-                    # 处理第一块
-                    lines = first_text.split("\n")
-                    for line in lines:
-                        if not line.strip():
-                            continue
-
-                        if line.startswith("data: "):
-                            line = line[6:]
-                            if line == "[DONE]":
-                                break
-
-                            try:
-                                chunk = json.loads(line)
-                                if "choices" in chunk and len(chunk["choices"]) > 0:
-                                    delta = chunk["choices"][0].get("delta", {})
-                                    if "content" in delta and delta["content"]:
-                                        yield delta["content"]
-                            except json.JSONDecodeError as e:
-                                raise e
-
-                    # 继续处理剩余流
-                    async for line in response.content:
-                        line = line.decode("utf-8", errors="replace").strip()
-                        if not line:
-                            continue
-
-                        if line.startswith("data: "):
-                            line = line[6:]
-                            if line == "[DONE]":
-                                break
-
-                            try:
-                                chunk = json.loads(line)
-                                if "choices" in chunk and len(chunk["choices"]) > 0:
-                                    delta = chunk["choices"][0].get("delta", {})
-                                    if "content" in delta and delta["content"]:
-                                        yield delta["content"]
-                            except json.JSONDecodeError as e:
-                                raise e
+            payload = {
+                "model": self.model_name,
+                "messages": [m.to_payload(self.cache_control) for m in messages],
+                "stream": True,
+            }
+            if self.stream_usage:
+                # 让服务端在最后一个数据块中返回 token 用量，无需在本地重新计算
+                payload["stream_options"] = {"include_usage": True}
+
+            session = self._get_session()
+            async with session.post(f"{self.base_url}/chat/completions", headers=headers, json=payload) as response:
+                # 检查响应状态码
+                response.raise_for_status()
+
+                # 逐行解析 SSE 流（按字节处理，orjson 直接解析，无需先解码为字符串）
+                async for line in response.content:
+                    line = line.strip()
+                    if not line.startswith(b"data: "):
+                        continue
+
+                    data = line[6:]
+                    if data == b"[DONE]":
+                        break
+
+                    chunk = orjson.loads(data)
+                    choices = chunk.get("choices")
+                    if choices:
+                        content = choices[0].get("delta", {}).get("content")
+                        if content:
+                            yield content
+                    if chunk.get("usage"):
+                        _log_prompt_cache_usage(self.model_name, chunk)
+                        if usage is not None:
+                            usage.update(chunk["usage"])
         except Exception as e:
-            logger.error(f"OpenAI chat completion API failure: {type(e).__name__} - {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("OpenAI chat completion API failure: {} - {}", type(e).__name__, e)
             yield LLMErrorResponse(reason="(OpenAI) " + str(e)).text
 
 
@@ -152,57 +188,58 @@ class OllamaLLM(BaseLLM):
     async def chat_completion(self, messages: List[LLMMessage]) -> LLMResponse:
         try:
             headers = {"Content-Type": "application/json"}
-            payload = {"model": self.model_name, "messages": [m.dict() for m in messages], "stream": False}
+            payload = {"model": self.model_name, "messages": [m.to_payload() for m in messages], "stream": False}
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.base_url}/api/chat", headers=headers, json=payload) as response:
-                    response.raise_for_status()  # 检查响应状态码
+            session = self._get_session()
+            async with session.post(f"{self.base_url}/api/chat", headers=headers, json=payload) as response:
+                response.raise_for_status()  # 检查响应状态码
 
-                    result = await response.json()
-                    if "error" in result:
-                        raise Exception(f"Ollama API error: {result['error']}")
+                result = await response.json(loads=orjson.loads)
+                if "error" in result:
+                    raise Exception(f"Ollama API error: {result['error']}")
 
-                    # Ollama API 通常会在 response 包含 message 字段
-                    return LLMResponse(
-                        text=result.get("message", {}).get("content", ""),
-                        raw_response=result,
-                    )
+                # Ollama API 通常会在 response 包含 message 字段
+                return LLMResponse(
+                    text=result.get("message", {}).get("content", ""),
+                    raw_response=result,
+                )
         except Exception as e:
-            logger.error(f"Ollama chat completion API failure: {type(e).__name__} - {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("Ollama chat completion API failure: {} - {}", type(e).__name__, e)
             return LLMErrorResponse(reason="(Ollama) " + str(e))
 
-    async def chat_completion_stream(self, messages: List[LLMMessage]) -> AsyncGenerator[str, None]:
+    async def chat_completion_stream(
+        self, messages: List[LLMMessage], usage: Optional[Dict[str, Any]] = None
+    ) -> AsyncGenerator[str, None]:
         try:
             headers = {"Content-Type": "application/json"}
 
-            ollama_messages = [m.dict() for m in messages]
+            ollama_messages = [m.to_payload() for m in messages]
 
             payload = {"model": self.model_name, "messages": ollama_messages, "stream": True}
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.base_url}/api/chat", headers=headers, json=payload) as response:
-                    response.raise_for_status()  # 检查响应状态码
-
-                    async for chunk in response.content:
-                        if not chunk:
-                            continue
-
-                        try:
-                            data = json.loads(chunk)
-                            # Ollama 的流式响应通常会包含 message 字段
-                            if "message" in data and "content" in data["message"]:
-                                content = data["message"]["content"]
-                                if content:
-                                    yield content
-                            # 处理另一种可能的响应格式，直接包含 'response' 字段
-                            elif "response" in data:
-                                content = data["response"]
-                                if content:
-                                    yield content
-                        except json.JSONDecodeError as e:
-                            raise e
+            session = self._get_session()
+            async with session.post(f"{self.base_url}/api/chat", headers=headers, json=payload) as response:
+                response.raise_for_status()  # 检查响应状态码
+
+                async for chunk in response.content:
+                    if not chunk:
+                        continue
+
+                    data = orjson.loads(chunk)
+                    # Ollama 的流式响应通常会包含 message 字段
+                    if "message" in data and "content" in data["message"]:
+                        content = data["message"]["content"]
+                        if content:
+                            yield content
+                    # 处理另一种可能的响应格式，直接包含 'response' 字段
+                    elif "response" in data:
+                        content = data["response"]
+                        if content:
+                            yield content
+                    # 最后一个数据块包含 token 用量统计
+                    if data.get("done") and usage is not None:
+                        usage["prompt_tokens"] = data.get("prompt_eval_count")
+                        usage["completion_tokens"] = data.get("eval_count")
         except Exception as e:
-            logger.error(f"Ollama chat completion API failure: {type(e).__name__} - {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception("Ollama chat completion API failure: {} - {}", type(e).__name__, e)
             yield LLMErrorResponse(reason="(Ollama) " + str(e)).text
@@ -10,7 +10,7 @@ from typing import Any, List, Optional
 import time
 import uuid
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class MessageRole(str, Enum):
@@ -48,6 +48,8 @@ class Message(BaseModel):
     message_str: str
     timestamp: int = Field(default_factory=lambda: int(time.time()))
     raw_message: Optional[Any] = None
+    # 提取出的纯文本缓存（由文本处理流水线填充，组件变化时失效）
+    _cached_text: Optional[str] = PrivateAttr(default=None)
 
     @classmethod
     def from_text(cls, text: str, role: MessageRole = MessageRole.USER):
@@ -90,6 +92,7 @@ class Message(BaseModel):
         """添加新的组件到现有消息"""
         self.components.append(component)
         self.message_str = " ".join(comp.to_display_text() for comp in self.components)
+        self._cached_text = None
         return self
 
 
@@ -5,21 +5,18 @@ app/core/pipeline/chat_process.py
 - 支持多模型、多轮对话。
 """
 
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, List, Union, AsyncGenerator, Tuple
 
-import json
-import traceback
 
+import orjson
 from fastapi import UploadFile, HTTPException
 from fastapi.responses import StreamingResponse
 from loguru import logger
 
-from ... import app_config
-from .text_process import get_text_process
-from ..tts.tts_service import text_to_speech_stream
+from .text_process import DEFAULT_MODEL, get_text_process
+from ..tts.tts_service import tts_batcher
 from ..llm.message import Message, Response, MessageRole
 import asyncio
-import re
 import base64
 from ...services.asr_service import get_asr_service
 
@@ -27,16 +24,32 @@ from ...services.asr_service import get_asr_service
 from ...services.asr_service import get_asr_service
 
 
-def _get_default_model():
-    """安全获取默认LLM模型"""
-    try:
-        return app_config["llm"]["default_model"]
-    except Exception:
-        # 回退到硬编码的默认值
-        return "gpt-3.5-turbo"
+# SSE 响应头（不变量，所有流式响应共享）
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+    "Content-Type": "text/event-stream",
+}
 
 
-DEFAULT_MODEL = _get_default_model()
+# TTS 断句使用的句子分隔符
+_SENTENCE_DELIMITERS = "。！？，"
+# 在每个分隔符后插入标记字符，切分时保留分隔符本身
+_SENTENCE_MARK = "\x01"
+_SENTENCE_TRANS = str.maketrans({d: d + _SENTENCE_MARK for d in _SENTENCE_DELIMITERS})
+_SENTENCE_DELIMITER_BYTES = tuple(d.encode("utf-8") for d in _SENTENCE_DELIMITERS)
+
+
+def _sse(payload: Dict[str, Any]) -> bytes:
+    """将数据编码为 SSE 帧（orjson 直接输出 UTF-8 字节）"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+# 预编码的固定 SSE 帧
+_DONE = b"data: [DONE]\n\n"
+_EMPTY_TEXT = "未能生成响应"
+_EMPTY_RESP = _sse({"text": _EMPTY_TEXT})
 
 
 class ChatProcess:
@@ -79,16 +92,25 @@ class ChatProcess:
         transcribed_text = None
 
         try:
-            # 确保参数合法
-            model = model or DEFAULT_MODEL
+            # 确保参数合法（仅在入口处归一化一次，下游不再重复判断）
+            if not model:
+                model = DEFAULT_MODEL
+
+            # 历史记录与输入消息准备（可能包含语音识别）互不依赖，提前并发获取
+            history_task = asyncio.create_task(get_text_process().fetch_history())
 
             # 准备输入消息
-            input_message = await self._prepare_input_message(
-                message,
-                role,
-                stt,
-                audio_file,
-            )
+            try:
+                input_message = await self._prepare_input_message(
+                    message,
+                    role,
+                    stt,
+                    audio_file,
+                )
+            except BaseException:
+                history_task.cancel()
+                raise
+            history = await history_task
 
             # 如果是语音输入，获取语音转写文本
             if stt and audio_file and hasattr(input_message, "message_str"):
@@ -97,16 +119,15 @@ class ChatProcess:
             # 根据流式处理需求选择处理方式
             if stream:
                 return await self._handle_stream_response(
-                    model, input_message, user_id, stt, tts, transcribed_text
+                    model, input_message, user_id, stt, tts, transcribed_text, history
                 )
             else:
-                return await self._handle_normal_response(model, input_message, user_id, tts)
+                return await self._handle_normal_response(model, input_message, user_id, tts, history)
 
         except HTTPException:
             raise
         except Exception as e:
-            error_trace = traceback.format_exc()
-            logger.error(f"聊天处理流水线异常: {str(e)}\n{error_trace}")
+            logger.exception("聊天处理流水线异常: {}", e)
             raise HTTPException(status_code=500, detail=f"处理请求失败: {str(e)}")
 
     async def _prepare_input_message(
@@ -175,6 +196,151 @@ class ChatProcess:
             logger.error(f"准备输入消息失败: {str(e)}")
             raise
 
+    async def stream_chat(
+        self,
+        model: Optional[str],
+        message: Optional[str],
+        role: MessageRole,
+        tts: bool,
+        user_id: Optional[str] = None,
+    ) -> AsyncGenerator[Tuple[str, Any], None]:
+        """
+        流式处理文本消息，供 WebSocket 等非 SSE 调用方使用
+
+        与 handle_request(stream=True) 相同的处理流程，但直接产出事件而不编码为 SSE，
+        音频以原始字节返回，无需 Base64 编码再解码。
+
+        Yields:
+            ("text", str) / ("audio", bytes) / ("error", str)
+        """
+        if not model:
+            model = DEFAULT_MODEL
+
+        history_task = asyncio.create_task(get_text_process().fetch_history())
+        try:
+            input_message = await self._prepare_input_message(message, role)
+        except BaseException:
+            history_task.cancel()
+            raise
+        history = await history_task
+
+        async for event in self._stream_events(model, input_message, tts, history):
+            yield event
+
+    async def _stream_events(
+        self,
+        model: str,
+        input_message: Message,
+        tts: bool,
+        history: Optional[List[Message]] = None,
+    ) -> AsyncGenerator[Tuple[str, Any], None]:
+        """
+        生成流式事件：文本块、合成好的音频（原始字节）以及错误信息
+
+        Yields:
+            ("text", str) / ("audio", bytes) / ("error", str)
+        """
+        text_buffer = bytearray()  # 用于拼接文本块（UTF-8 字节，原地追加）
+
+        async def process_tts_queue(queue, yield_queue):
+            while True:
+                text_chunk = await queue.get()
+                if text_chunk is None:
+                    logger.info("TTS处理任务收到停止信号，正常退出。")
+                    break
+                logger.debug("发送文本块到TTS服务: {!r}", text_chunk)
+                # 交由全局批处理器合成，与其他请求的文本块合并调度
+                result = await tts_batcher.submit(text_chunk)
+                if result:
+                    sr, audio_bytes = result
+                    await yield_queue.put(audio_bytes)
+                queue.task_done()
+
+        tts_queue = asyncio.Queue()
+        yield_queue = asyncio.Queue()
+        text_queue = asyncio.Queue()
+        tts_task = None
+        text_task = None
+        if tts:
+            logger.info("创建TTS处理任务。")
+            tts_task = asyncio.create_task(process_tts_queue(tts_queue, yield_queue))
+
+        async def collect_text():
+            async for chunk in get_text_process().process_message_stream(
+                model, input_message, skip_db=False, history=history
+            ):
+                await text_queue.put(chunk)
+            await text_queue.put(None)
+
+        text_task = asyncio.create_task(collect_text())
+
+        try:
+            count = 0
+
+            # 处理消息流
+            while True:
+                chunk = await text_queue.get()
+                if chunk is None:
+                    break
+                count += 1
+
+                yield "text", chunk
+
+                # 检查是否有音频准备好
+                if tts:
+                    try:
+                        audio_bytes = await asyncio.wait_for(yield_queue.get(), timeout=0.01)
+                        yield "audio", audio_bytes
+                        yield_queue.task_done()
+                    except asyncio.TimeoutError:
+                        pass
+
+                    text_buffer += chunk.encode("utf-8")
+                    # 新文本块不含分隔符时缓冲区中不会出现新句子，跳过切分
+                    if not any(d in chunk for d in _SENTENCE_DELIMITERS):
+                        continue
+
+                    # 从尾部查找最后一个分隔符，只解码并切分其之前的完整句子
+                    end = max(
+                        text_buffer.rfind(d) + len(d) if d in text_buffer else 0
+                        for d in _SENTENCE_DELIMITER_BYTES
+                    )
+                    segment = text_buffer[:end].decode("utf-8")
+                    del text_buffer[:end]
+
+                    for sentence in segment.translate(_SENTENCE_TRANS).split(_SENTENCE_MARK):
+                        sentence = sentence.strip()
+                        if sentence:
+                            logger.debug("将句子放入TTS队列: {!r}", sentence)
+                            await tts_queue.put(sentence)
+
+
+            # 如果没有生成任何内容
+            if count == 0:
+                yield "text", _EMPTY_TEXT
+
+            # 处理缓冲区中剩余的文本
+            remaining_text = text_buffer.decode("utf-8", errors="ignore").strip()
+            if tts and remaining_text:
+                logger.debug("将缓冲区剩余文本放入TTS队列: {!r}", remaining_text)
+                await tts_queue.put(remaining_text)
+
+            # 等待TTS任务完成并发送剩余音频
+            if tts_task:
+                await tts_queue.put(None)
+                await tts_task
+                while not yield_queue.empty():
+                    audio_bytes = await yield_queue.get()
+                    yield "audio", audio_bytes
+                    yield_queue.task_done()
+
+        except Exception as e:
+            logger.exception("流式处理失败: {}", e)
+            yield "error", str(e)
+        finally:
+            if text_task and not text_task.done():
+                await text_task
+
     async def _handle_stream_response(
         self,
         model: str,
@@ -183,6 +349,7 @@ class ChatProcess:
         stt: bool,
         tts: bool,
         transcribed_text: Optional[str],
+        history: Optional[List[Message]] = None,
     ) -> StreamingResponse:
         """
         处理流式响应
@@ -192,125 +359,26 @@ class ChatProcess:
         """
 
         async def generate():
-            text_buffer = ""  # 用于拼接文本块
-            sentence_delimiters = re.compile(r"([。！？，])")  # 定义句子分隔符
-
-            async def process_tts_queue(queue, yield_queue):
-                while True:
-                    text_chunk = await queue.get()
-                    if text_chunk is None:
-                        logger.info("TTS处理任务收到停止信号，正常退出。")
-                        break
-                    logger.info(f"发送文本块到TTS服务: '{text_chunk}'")
-                    result = await text_to_speech_stream(text_chunk)
-                    if result:
-                        sr, audio_bytes = result
-                        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-                        await yield_queue.put(f"data: {json.dumps({'audio': audio_base64})}\n\n")
-                    queue.task_done()
-
-            tts_queue = asyncio.Queue()
-            yield_queue = asyncio.Queue()
-            text_queue = asyncio.Queue()
-            tts_task = None
-            text_task = None
-            if tts:
-                logger.info("创建TTS处理任务。")
-                tts_task = asyncio.create_task(process_tts_queue(tts_queue, yield_queue))
-
-            async def collect_text():
-                async for chunk in get_text_process().process_message_stream(
-                    model, input_message, skip_db=False
-                ):
-                    await text_queue.put(chunk)
-                await text_queue.put(None)
-
-            text_task = asyncio.create_task(collect_text())
-
             try:
-                count = 0
-                full_response_text = ""  # 收集完整响应用于TTS
-
                 # 如果是语音输入，先返回识别结果
                 if stt and transcribed_text:
-                    yield f"data: {json.dumps({'transcription': transcribed_text})}\n\n"
-
-                # 处理消息流
-                while True:
-                    chunk = await text_queue.get()
-                    if chunk is None:
-                        break
-                    count += 1
-
-                    # 收集完整响应文本用于TTS
-                    full_response_text += chunk
-                    # 将普通文本块包装为SSE格式
-                    response_text = f"data: {json.dumps({'text': chunk})}\n\n"
-                    yield response_text
-                    
-                    # 检查是否有音频准备好
-                    if tts:
-                        try:
-                            audio_data = await asyncio.wait_for(yield_queue.get(), timeout=0.01)
-                            yield audio_data
-                            yield_queue.task_done()
-                        except asyncio.TimeoutError:
-                            pass
-                        
-                        text_buffer += chunk
-                        parts = sentence_delimiters.split(text_buffer)
-                        
-                        # 处理切分后的部分
-                        for i in range(len(parts) // 2):
-                            sentence = parts[2*i] + parts[2*i+1]
-                            if sentence.strip():
-                                logger.debug(f"将句子放入TTS队列: '{sentence.strip()}'")
-                                await tts_queue.put(sentence.strip())
-                        
-                        # 更新缓冲区为剩余的未切分部分
-                        if len(parts) % 2 == 1:
-                            text_buffer = parts[-1]
-                        else:
-                            text_buffer = ""
-
-
-                # 如果没有生成任何内容
-                if count == 0:
-                    yield f"data: {json.dumps({'text': '未能生成响应'})}\n\n"
-
-                # 处理缓冲区中剩余的文本
-                if tts and text_buffer.strip():
-                    logger.debug(f"将缓冲区剩余文本放入TTS队列: '{text_buffer.strip()}'")
-                    await tts_queue.put(text_buffer.strip())
-
-                # 等待TTS任务完成并发送剩余音频
-                if tts_task:
-                    await tts_queue.put(None)
-                    await tts_task
-                    while not yield_queue.empty():
-                        audio_data = await yield_queue.get()
-                        yield audio_data
-                        yield_queue.task_done()
-
-            except Exception as e:
-                error_trace = traceback.format_exc()
-                logger.error(f"流式处理失败: {str(e)}\n{error_trace}")
-                yield f"data: {json.dumps({'error': str(e)})}\n\n"
+                    yield _sse({'transcription': transcribed_text})
+
+                async for kind, value in self._stream_events(model, input_message, tts, history):
+                    if kind == "audio":
+                        yield _sse({'audio': base64.b64encode(value).decode('ascii')})
+                    elif value is _EMPTY_TEXT:
+                        yield _EMPTY_RESP
+                    else:
+                        yield _sse({kind: value})
             finally:
-                if text_task and not text_task.done():
-                    await text_task
-                yield "data: [DONE]\n\n"
+                yield _DONE
 
         # 确保设置正确的 SSE 响应头
         return StreamingResponse(
             generate(),
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no",
-                "Content-Type": "text/event-stream",
-            },
+            headers=_SSE_HEADERS,
         )
 
     async def _handle_normal_response(
@@ -319,6 +387,7 @@ class ChatProcess:
         input_message: Message,
         user_id: Optional[str],
         tts: bool = False,
+        history: Optional[List[Message]] = None,
     ) -> Union[Response, Dict[str, Any]]:
         """
         处理普通（非流式）响应
@@ -328,13 +397,16 @@ class ChatProcess:
             input_message: 输入消息
             user_id: 用户ID
             tts: 是否需要文本转语音
+            history: 预先获取的历史记录
 
         Returns:
             Response或包含响应信息的字典
         """
         try:
             # 使用文本处理流水线处理消息
-            response = await get_text_process().process_message(model, input_message, skip_db=False)
+            response = await get_text_process().process_message(
+                model, input_message, skip_db=False, history=history
+            )
 
             # 如果需要TTS处理
             if tts and response and hasattr(response, "response_text"):
@@ -347,8 +419,7 @@ class ChatProcess:
         except HTTPException:
             raise
         except Exception as e:
-            error_trace = traceback.format_exc()
-            logger.error(f"普通响应处理失败: {str(e)}\n{error_trace}")
+            logger.exception("普通响应处理失败: {}", e)
             raise
 
 
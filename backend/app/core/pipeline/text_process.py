@@ -1,14 +1,18 @@
-from typing import Dict, Optional, AsyncGenerator
+from typing import Any, Callable, Dict, Final, List, Optional, Set, Tuple, AsyncGenerator
 
+import asyncio
+import sys
+import time
 import uuid
+from collections import OrderedDict
+from functools import partial
 import json
-import traceback
 from loguru import logger
 
 from ... import app_config
 from ...core.db.db_history import db_message_history
 from ...core.llm.message import Response, Message, MessageSender, MessageRole, MessageComponent
-from ...core.llm.chat import LLMMessage, LLMResponse, LLMConfig, BaseLLM, OpenAILLM, OllamaLLM
+from ...core.llm.chat import LLMMessage, LLMResponse, LLMErrorResponse, LLMConfig, BaseLLM, OpenAILLM, OllamaLLM
 
 
 llm_config = app_config.llm
@@ -18,19 +22,47 @@ if llm_config is None:
 # 调试信息：打印LLM配置
 logger.info(f"LLM配置: {llm_config}")
 
+
+def _build_maps(cfg) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """一次遍历配置，构建模型到端点的映射以及各端点（去除空白后的）模型列表"""
+    model_to_endpoint: Dict[str, str] = {}
+    models: Dict[str, List[str]] = {}
+    for endpoint, key in (
+        ("openai", "openai_models"),  # OpenAI 模型
+        ("ollama", "ollama_models"),  # Ollama 模型
+        ("custom_endpoint", "custom_endpoint_models"),  # 自定义端点模型
+    ):
+        names = [model.strip() for model in cfg.get(key, [])]
+        models[endpoint] = names
+        for name in names:
+            model_to_endpoint[name] = endpoint
+    return model_to_endpoint, models
+
+
 # 创建模型到端点的映射（基于现有配置）
-MODEL_TO_ENDPOINT = {
-    # OpenAI 模型
-    **{model.strip(): "openai" for model in llm_config.get("openai_models", [])},
-    # Ollama 模型
-    **{model.strip(): "ollama" for model in llm_config.get("ollama_models", [])},
-    # 自定义端点模型
-    **{model.strip(): "custom_endpoint" for model in llm_config.get("custom_endpoint_models", [])},
+MODEL_TO_ENDPOINT, _MODELS = _build_maps(llm_config)
+
+
+def _get_default_model() -> str:
+    """安全获取默认LLM模型"""
+    try:
+        return llm_config["default_model"]
+    except Exception:
+        # 回退到硬编码的默认值
+        return "gpt-3.5-turbo"
+
+
+# 默认模型在导入时解析一次，请求路径直接使用
+DEFAULT_MODEL: Final[str] = _get_default_model()
+
+# 消息角色到LLM角色字符串的映射（同时支持枚举成员与原始字符串值，未知角色按 user 处理）
+_ROLE_MAP: Dict[object, str] = {
+    **{role: role.value for role in MessageRole},
+    **{role.value: role.value for role in MessageRole},
 }
-DEFAULT_MODEL = llm_config["default_model"]
 
-# 定义系统提示词
-SYSTEM_PROMPT = """
+# 定义系统提示词（驻留，供各处按身份复用同一字符串对象）
+SYSTEM_PROMPT = sys.intern("""
 在接下来的对话中你要扮演以下角色和我对话，我知道你是AI，但是在对话中你不需要提及这件事情，只需要好好扮演即可：
 人物背景：
 
@@ -52,7 +84,64 @@ SYSTEM_PROMPT = """
 每次说话不要超过25字
 不要说除了中文以外其他任何语言，包括英语单词，字母，尤其是日语
 不要输出markdown语法的标点符号，只需要，。”！即可
-"""
+""")
+
+# LLMErrorResponse 生成的错误文本前缀
+_LLM_ERROR_PREFIX = LLMErrorResponse(reason="").text
+
+
+def _log_usage(model: str, usage: Optional[Dict[str, Any]]) -> None:
+    """每次回复记录一条 token 用量日志（服务端未返回用量时跳过）"""
+    if usage:
+        logger.info(
+            "LLM用量 - model: {}, prompt_tokens: {}, completion_tokens: {}, total_tokens: {}",
+            model, usage.get("prompt_tokens"), usage.get("completion_tokens"), usage.get("total_tokens"),
+        )
+
+# 系统提示词消息为常量，在导入时构建一次，各请求共享；标记为可缓存前缀，始终位于消息列表首位
+SYSTEM_MSG = LLMMessage(role="system", content=SYSTEM_PROMPT, cache=True)
+# 预先生成系统提示词的请求体，后续请求直接复用
+SYSTEM_MSG.to_payload()
+SYSTEM_MSG.to_payload(cache_control=True)
+
+
+class _ReplyCache:
+    """
+    按完整消息列表（模型 + 系统提示词 + 历史 + 当前消息）精确匹配的LLM回复缓存。
+    - 带过期时间的LRU，命中时跳过LLM调用。
+    - 记录命中/未命中次数。
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[tuple, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, chat_messages: List[LLMMessage]) -> tuple:
+        return (model, tuple((m.role, m.content) for m in chat_messages))
+
+    def get(self, key: tuple) -> Optional[str]:
+        item = self._data.get(key)
+        if item is not None:
+            if item[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            del self._data[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: tuple, text: str):
+        self._data[key] = (time.monotonic() + self.ttl, text)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
 
 
 class TextProcess:
@@ -61,41 +150,74 @@ class TextProcess:
     """
 
     def __init__(self):
+        # 已创建的LLM实例；实例在首次使用时才由 _llm_factories 中的工厂创建
         self.llm_instances: Dict[str, BaseLLM] = {}
+        self._llm_factories: Dict[str, Callable[[], BaseLLM]] = {}
+        # 历史消息到LLM消息的转换缓存（message_id -> LLMMessage），每轮只保留当前窗口内的消息
+        self._llm_message_cache: Dict[str, LLMMessage] = {}
+        # 后台进行中的历史记录写入任务（持有引用，防止任务被回收）
+        self._pending_writes: Set[asyncio.Task] = set()
+        # LLM回复缓存（默认关闭，通过 llm.reply_cache_enabled 开启）
+        self._reply_cache: Optional[_ReplyCache] = None
+        if llm_config.get("reply_cache_enabled", False):
+            self._reply_cache = _ReplyCache(
+                maxsize=llm_config.get("reply_cache_size", 512),
+                ttl=llm_config.get("reply_cache_ttl", 300),
+            )
         self._initialize_llms()
 
     def _initialize_llms(self):
-        # 根据新的配置结构初始化LLM实例
+        # 根据新的配置结构注册LLM实例工厂（惰性创建）
         openai_config = app_config.openai
         custom_endpoint_config = app_config.custom_endpoint
 
         # 初始化OpenAI模型
         if openai_config:
-            for model in llm_config.get("openai_models", []):
-                model = model.strip()
+            for model in _MODELS["openai"]:
                 llm_config_obj = LLMConfig(
-                    api_key=openai_config["api_key"], base_url=openai_config["base_url"], model_name=model
+                    api_key=openai_config["api_key"],
+                    base_url=openai_config["base_url"],
+                    model_name=model,
+                    stream_usage=True,
+                    max_connections=llm_config.get("max_connections", 64),
                 )
-                self.llm_instances[model] = OpenAILLM(llm_config_obj)
+                self._llm_factories[model] = partial(OpenAILLM, llm_config_obj)
 
         # 初始化Ollama模型
-        for model in llm_config.get("ollama_models", []):
-            model = model.strip()
+        for model in _MODELS["ollama"]:
             llm_config_obj = LLMConfig(
-                api_key="", base_url=llm_config["ollama_base_url"], model_name=model  # Ollama通常不需要API key
+                api_key="",  # Ollama通常不需要API key
+                base_url=llm_config["ollama_base_url"],
+                model_name=model,
+                max_connections=llm_config.get("max_connections", 64),
             )
-            self.llm_instances[model] = OllamaLLM(llm_config_obj)
+            self._llm_factories[model] = partial(OllamaLLM, llm_config_obj)
 
         # 初始化自定义端点模型
         if custom_endpoint_config:
-            for model in llm_config.get("custom_endpoint_models", []):
-                model = model.strip()
+            for model in _MODELS["custom_endpoint"]:
                 llm_config_obj = LLMConfig(
                     api_key=custom_endpoint_config["api_key"],
                     base_url=llm_config["custom_endpoint_base_url"],
                     model_name=model,
+                    # OpenAI 兼容服务不一定支持 stream_options，默认不发送
+                    stream_usage=llm_config.get("custom_endpoint_stream_usage", False),
+                    max_connections=llm_config.get("max_connections", 64),
                 )
-                self.llm_instances[model] = OpenAILLM(llm_config_obj)  # 使用OpenAI兼容格式
+                self._llm_factories[model] = partial(OpenAILLM, llm_config_obj)  # 使用OpenAI兼容格式
+
+    def _get_llm(self, model: str) -> BaseLLM:
+        """获取模型对应的LLM实例，首次使用时创建"""
+        llm = self.llm_instances.get(model)
+        if llm is None:
+            llm = self.llm_instances[model] = self._llm_factories[model]()
+        return llm
+
+    async def close(self):
+        """等待后台写入完成，并关闭所有LLM实例持有的持久连接"""
+        await self.drain()
+        for llm in self.llm_instances.values():
+            await llm.close()
 
     def _get_endpoint_for_model(self, model: str) -> str:
         model = model or DEFAULT_MODEL
@@ -105,75 +227,130 @@ class TextProcess:
 
     async def process_chat(self, model: str, message: str) -> LLMResponse:
         model = model or DEFAULT_MODEL
-        if model not in self.llm_instances:
+        if model not in self._llm_factories:
             raise ValueError(f"未知的模型: {model}")
 
         messages = [LLMMessage(role="user", content=message)]
-        llm = self.llm_instances[model]
+        llm = self._get_llm(model)
         return await llm.chat_completion(messages)
 
     def _extract_text_from_message(self, llm_message: Message) -> str:
-        """从LLMMessage中提取纯文本内容，用于发送给LLM"""
+        """从LLMMessage中提取纯文本内容，用于发送给LLM（结果缓存在消息对象上）"""
+        cached_text = llm_message._cached_text
+        if cached_text is not None:
+            return cached_text
+
         # 首先尝试使用message_str
         if llm_message.message_str and llm_message.message_str.strip():
-            return llm_message.message_str
+            text = llm_message.message_str
+        else:
+            # 否则从组件中提取文本
+            text = " ".join(component.content for component in llm_message.components if component.type == "text")
+
+        llm_message._cached_text = text
+        return text
+
+    def _to_llm_message(self, message: Message) -> LLMMessage:
+        """将消息转换为LLM消息格式"""
+        role = _ROLE_MAP.get(message.sender.role, "user")
 
-        # 否则从组件中提取文本
-        text_parts = []
-        for component in llm_message.components:
-            if component.type == "text":
-                text_parts.append(component.content)
+        # 从消息中提取文本内容
+        msg_text = self._extract_text_from_message(message)
 
-        return " ".join(text_parts) if text_parts else ""
+        return LLMMessage(role=role, content=msg_text)
+
+    async def fetch_history(self) -> List[Message]:
+        """获取历史记录（只取最近的消息，已在db层控制上下文窗口），失败时返回空列表"""
+        # 先等待上一轮尚未完成的后台写入，保证读到完整的历史
+        await self.drain()
+        try:
+            return await db_message_history.get_history()
+        except Exception as e:
+            logger.error(f"获取历史记录失败，只使用当前消息: {e}")
+            return []
+
+    async def _build_chat_messages(
+        self, message: Message, skip_db: bool, history: Optional[List[Message]] = None
+    ) -> List[LLMMessage]:
+        """
+        构建发送给LLM的消息列表（系统提示词 + 历史记录 + 当前消息）
+
+        history 可由调用方预先并发获取；为 None 时在此获取。
+        """
+        # 获取历史消息并转换为LLM消息格式（系统提示词始终位于开头）
+        chat_messages = [SYSTEM_MSG]
+        # 历史消息内容不会变化，上一轮已转换过的消息直接复用，只转换新增的消息
+        cache = self._llm_message_cache
+        converted: Dict[str, LLMMessage] = {}
+        if not skip_db:
+            if history is None:
+                history = await self.fetch_history()
+
+            for hist_msg in history:
+                llm_message = cache.get(hist_msg.message_id)
+                if llm_message is None:
+                    llm_message = self._to_llm_message(hist_msg)
+                converted[hist_msg.message_id] = llm_message
+                chat_messages.append(llm_message)
+
+        # 当前消息在回复完成后才与AI回复一起写入数据库，这里直接追加到本地列表
+        llm_message = self._to_llm_message(message)
+        chat_messages.append(llm_message)
+        if not skip_db:
+            converted[message.message_id] = llm_message
+            self._llm_message_cache = converted
+
+        return chat_messages
+
+    async def _save_messages(self, messages: List[Message]):
+        """将本轮对话的消息一次性批量写入历史记录"""
+        try:
+            await db_message_history.add_messages(messages)
+        except Exception as e:
+            logger.error(f"保存消息到历史记录失败: {e}")
+
+    def _save_messages_background(self, messages: List[Message]):
+        """在后台写入历史记录，不阻塞响应返回"""
+        task = asyncio.create_task(self._save_messages(messages))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    async def drain(self):
+        """等待所有后台历史记录写入完成"""
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+
+    def _lookup_reply_cache(self, model: str, chat_messages: List[LLMMessage]) -> Tuple[Optional[tuple], Optional[str]]:
+        """查询回复缓存，返回 (缓存键, 缓存的回复)；未启用缓存时均为 None"""
+        if self._reply_cache is None:
+            return None, None
+        cache_key = _ReplyCache.make_key(model, chat_messages)
+        cached_text = self._reply_cache.get(cache_key)
+        if cached_text is not None:
+            logger.debug("回复缓存命中，当前统计: {}", self._reply_cache.stats())
+        return cache_key, cached_text
 
     async def process_message(
-        self, model: str, message: Message, skip_db: bool = False
+        self, model: str, message: Message, skip_db: bool = False,
+        history: Optional[List[Message]] = None,
     ) -> Response:
-        model = model or DEFAULT_MODEL
-        if model not in self.llm_instances:
+        if model not in self._llm_factories:
             raise ValueError(f"未知的模型: {model}")
 
+        response_message = None
         try:
-            # 从消息中提取文本内容用于LLM处理
-            message_text = self._extract_text_from_message(message)
-
-            # 尝试保存用户消息到历史记录
-            if not skip_db:
-                try:
-                    await db_message_history.add_message(message)
-                except Exception as e:
-                    logger.error(f"保存用户消息到历史记录失败，但继续处理: {e}")
-
-            # 获取历史消息并转换为LLM消息格式
-            chat_messages = []
-            if not skip_db:
-                try:
-                    history = await db_message_history.get_history()
-
-                    for hist_msg in history:
-                        role = "user"
-                        if hist_msg.sender.role == MessageRole.ASSISTANT:
-                            role = "assistant"
-                        elif hist_msg.sender.role == MessageRole.SYSTEM:
-                            role = "system"
-
-                        # 从消息中提取文本内容
-                        msg_text = self._extract_text_from_message(hist_msg)
-
-                        chat_messages.append(LLMMessage(role=role, content=msg_text))
-
-                except Exception as e:
-                    logger.error(f"获取历史记录失败，只使用当前消息: {e}")
-
-            if not chat_messages:
-                chat_messages = [LLMMessage(role="user", content=message_text)]
-            
-            # 始终在消息列表开头添加系统提示词
-            chat_messages.insert(0, LLMMessage(role="system", content=SYSTEM_PROMPT))
-
-            # 调用LLM进行回复
-            llm = self.llm_instances[model]
-            raw_response = await llm.chat_completion(chat_messages)
+            chat_messages = await self._build_chat_messages(message, skip_db, history)
+
+            # 调用LLM进行回复（命中回复缓存时跳过）
+            cache_key, cached_text = self._lookup_reply_cache(model, chat_messages)
+            if cached_text is not None:
+                raw_response = LLMResponse(text=cached_text, raw_response={"cached": True})
+            else:
+                llm = self._get_llm(model)
+                raw_response = await llm.chat_completion(chat_messages)
+                _log_usage(model, (raw_response.raw_response or {}).get("usage"))
+                if cache_key is not None and not isinstance(raw_response, LLMErrorResponse):
+                    self._reply_cache.put(cache_key, raw_response.text)
 
             response_message = Message(
                 sender=MessageSender(role=MessageRole.ASSISTANT, nickname=model),
@@ -181,101 +358,73 @@ class TextProcess:
                 message_str=raw_response.text,
             )
 
-            # 尝试保存AI回复到历史记录
-            if not skip_db:
-                try:
-                    await db_message_history.add_message(response_message)
-                except Exception as e:
-                    logger.error(f"保存AI回复到历史记录失败: {e}")
-
             return Response(
                 response_message=response_message,
                 raw_response=raw_response.raw_response,
             )
         except Exception as e:
-            error_trace = traceback.format_exc()
-            logger.error(f"处理消息时发生错误: {e}\n{error_trace}")
+            logger.exception("处理消息时发生错误: {}", e)
             raise
+        finally:
+            # 用户消息与AI回复一起在后台写入历史记录；LLM调用失败时仍保存用户消息
+            if not skip_db:
+                self._save_messages_background([message, response_message] if response_message is not None else [message])
 
     async def process_message_stream(
-        self, model: str, message: Message, skip_db: bool = False
+        self, model: str, message: Message, skip_db: bool = False,
+        history: Optional[List[Message]] = None,
     ) -> AsyncGenerator[str, None]:
         """流式处理消息并返回生成器"""
-        model = model or DEFAULT_MODEL
-        if model not in self.llm_instances:
+        if model not in self._llm_factories:
             raise ValueError(f"未知的模型: {model}")
 
-        try:
-            # 从消息中提取文本内容用于LLM处理
-            message_text = self._extract_text_from_message(message)
+        # 收集响应文本块，结束时一次性拼接
+        response_parts: List[str] = []
 
-            # 尝试保存用户消息到历史记录
-            if not skip_db:
-                try:
-                    await db_message_history.add_message(message)
-                except Exception as e:
-                    logger.error(f"保存用户消息到历史记录失败，但继续处理: {e}")
+        # 创建AI响应消息对象
+        response_message = Message(
+            sender=MessageSender(role=MessageRole.ASSISTANT, nickname=model),
+            components=[MessageComponent(type="text", content="")],  # 初始为空，稍后填充
+            message_str="",  # 初始为空，稍后填充
+        )
 
-            # 获取历史消息并转换为LLM消息格式
-            chat_messages = []
-            if not skip_db:
-                try:
-                    history = await db_message_history.get_history()
-
-                    # 只取最近的消息（已在db层控制上下文窗口）
-                    for hist_msg in history:
-                        role = "user"
-                        if hist_msg.sender.role == MessageRole.ASSISTANT:
-                            role = "assistant"
-                        elif hist_msg.sender.role == MessageRole.SYSTEM:
-                            role = "system"
-
-                        # 从消息中提取文本内容
-                        msg_text = self._extract_text_from_message(hist_msg)
-
-                        chat_messages.append(LLMMessage(role=role, content=msg_text))
-                except Exception as e:
-                    logger.error(f"获取历史记录失败，只使用当前消息: {e}")
-
-            # 如果没有历史消息，则只添加当前消息
-            if not chat_messages:
-                chat_messages = [LLMMessage(role="user", content=message_text)]
-            
-            # 始终在消息列表开头添加系统提示词
-            chat_messages.insert(0, LLMMessage(role="system", content=SYSTEM_PROMPT))
-
-            # 流式调用LLM
-            llm = self.llm_instances[model]
+        try:
+            chat_messages = await self._build_chat_messages(message, skip_db, history)
 
-            # 准备存储完整响应内容
-            full_response = ""
+            # 命中回复缓存时直接返回完整回复
+            cache_key, cached_text = self._lookup_reply_cache(model, chat_messages)
+            if cached_text is not None:
+                response_parts.append(cached_text)
+                yield cached_text
+                return
 
-            # 创建AI响应消息对象
-            response_message = Message(
-                sender=MessageSender(role=MessageRole.ASSISTANT, nickname=model),
-                components=[MessageComponent(type="text", content="")],  # 初始为空，稍后填充
-                message_str="",  # 初始为空，稍后填充
-            )
+            # 流式调用LLM
+            llm = self._get_llm(model)
 
-            # 流式返回结果
-            async for chunk in llm.chat_completion_stream(chat_messages):  # type: ignore
-                full_response += chunk
-                response_message.message_str = full_response
-                response_message.components[0].content = full_response
+            # 流式返回结果（token 用量由服务端在流结束时返回）
+            usage: Dict[str, Any] = {}
+            async for chunk in llm.chat_completion_stream(chat_messages, usage=usage):  # type: ignore
+                response_parts.append(chunk)
                 yield chunk
 
+            _log_usage(model, usage)
 
-            # 将完整响应消息保存到历史记录
-            if not skip_db:
-                try:
-                    await db_message_history.add_message(response_message)
-                except Exception as e:
-                    logger.error(f"保存AI回复到历史记录失败: {e}")
+            # 出错时流中返回的是错误文本，不写入缓存
+            if cache_key is not None and response_parts:
+                full_response = "".join(response_parts)
+                if not full_response.startswith(_LLM_ERROR_PREFIX):
+                    self._reply_cache.put(cache_key, full_response)
 
         except Exception as e:
-            error_trace = traceback.format_exc()
-            logger.error(f"处理消息时发生错误: {e}\n{error_trace}")
+            logger.exception("处理消息时发生错误: {}", e)
             yield f"错误: {str(e)}"
+        finally:
+            # 流结束后将用户消息与完整回复一次性在后台写入历史记录
+            if not skip_db:
+                full_response = "".join(response_parts)
+                response_message.message_str = full_response
+                response_message.components[0].content = full_response
+                self._save_messages_background([message, response_message] if full_response else [message])
 
 text_process = None
 
@@ -284,3 +433,9 @@ def get_text_process():
     if text_process is None:
         text_process = TextProcess()
     return text_process
+
+
+async def close_text_process():
+    """关闭全局文本处理实例（应用关闭时调用）"""
+    if text_process is not None:
+        await text_process.close()
@@ -0,0 +1,53 @@
+"""
+app/core/stt_security.py
+STT 接口鉴权。
+- 根据 stt.require_auth / stt.api_key 配置校验请求头中的 API Key。
+- 作为 FastAPI 依赖挂载到 STT 路由（含实时语音聊天 WebSocket）上。
+"""
+
+import hmac
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Security, WebSocket, WebSocketException, status
+from fastapi.security import APIKeyHeader
+
+from ..config.app_config import get_stt_settings
+
+_api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+
+def _auth_settings() -> Tuple[bool, bytes]:
+    """
+    解析鉴权配置：是否启用鉴权，以及编码为字节的 API Key
+
+    直接读取 get_stt_settings()（已在进程内缓存），配置刷新时无需单独清理缓存
+    """
+    stt_settings = get_stt_settings()
+    require_auth = bool(stt_settings.get("require_auth", False))
+    api_key = str(stt_settings.get("api_key", "") or "")
+    return require_auth, api_key.encode("utf-8")
+
+
+def _is_authorized(api_key: Optional[str]) -> bool:
+    """检查 API Key 是否有效（未启用鉴权时总是有效），使用 hmac.compare_digest 做常量时间比较"""
+    require_auth, key_bytes = _auth_settings()
+    if not require_auth:
+        return True
+    return bool(api_key) and bool(key_bytes) and hmac.compare_digest(api_key.encode("utf-8"), key_bytes)
+
+
+async def verify_api_key(api_key: Optional[str] = Security(_api_key_header)) -> None:
+    """校验请求头 X-API-Key"""
+    if not _is_authorized(api_key):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="无效的API Key")
+
+
+async def verify_websocket_api_key(websocket: WebSocket) -> None:
+    """
+    WebSocket 握手阶段校验 API Key
+
+    浏览器无法为 WebSocket 设置自定义请求头，因此除 X-API-Key 请求头外也接受 api_key 查询参数
+    """
+    api_key = websocket.headers.get("x-api-key") or websocket.query_params.get("api_key")
+    if not _is_authorized(api_key):
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="无效的API Key")
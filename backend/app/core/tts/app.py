@@ -8,21 +8,17 @@ import logging
 import os
 import sys
 import warnings
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
-# 导入我们的核心推理模块
+# 核心推理模块所在路径（core_inference 由路由模块导入）
 tts_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(tts_dir))))
 sys.path.append(tts_dir)
 sys.path.append(os.path.join(project_root, "GPT_SoVITS"))
-from core_inference import (
-    get_tts_wav,
-    load_models,
-    change_sovits_weights,
-    change_gpt_weights,
-    dict_language
-)
 
 # 导入后端配置模块
 from app.config.default import DEFAULT_CONFIG
@@ -34,50 +30,70 @@ logger = logging.getLogger(__name__)
 # 抑制警告
 warnings.filterwarnings("ignore")
 
-# 获取TTS配置
+# uvicorn 服务器实现：非 Windows 平台使用 uvloop 事件循环与 httptools HTTP 解析器
+UVICORN_SERVER_OPTIONS = {"loop": "uvloop", "http": "httptools"} if sys.platform != "win32" else {}
+
+# 获取TTS配置，并在导入时解析常用子配置（缺少必需项时在此处直接报错，而不是启动到一半才失败）
 tts_config = DEFAULT_CONFIG["tts"]["gpt_sovits"]
+default_models = tts_config["default_models"]
+pretrained_models = tts_config.get("pretrained_models", {})
+server_config = tts_config["server"]
+
+for _key in ("gpt_path", "sovits_path"):
+    if _key not in default_models:
+        raise KeyError(f"TTS配置缺少 default_models.{_key}")
 
 # 设置模型路径环境变量
 def set_model_env_vars():
-    """设置模型路径环境变量"""
-    default_models = tts_config["default_models"]
-    pretrained_models = tts_config.get("pretrained_models", {})
-
-    # 设置默认模型路径
-    os.environ["GPT_PATH"] = default_models["gpt_path"]
-    os.environ["SOVITS_PATH"] = default_models["sovits_path"]
-
-    # 设置预训练模型路径
-    os.environ["VOCODER_PATH"] = pretrained_models.get("vocoder_path",
-                                                      f"{project_root}/GPT_SoVITS/models/gsv-v4-pretrained/vocoder.pth")
+    """设置模型路径环境变量（已是目标值时不重复设置）"""
+    env = {
+        # 默认模型路径
+        "GPT_PATH": default_models["gpt_path"],
+        "SOVITS_PATH": default_models["sovits_path"],
+        # 预训练模型路径
+        "VOCODER_PATH": pretrained_models.get("vocoder_path",
+                                              f"{project_root}/GPT_SoVITS/models/gsv-v4-pretrained/vocoder.pth"),
+    }
+    if all(os.environ.get(key) == value for key, value in env.items()):
+        return
 
-    logger.info(f"设置GPT模型路径: {os.environ['GPT_PATH']}")
-    logger.info(f"设置SoVITS模型路径: {os.environ['SOVITS_PATH']}")
-    logger.info(f"设置Vocoder路径: {os.environ['VOCODER_PATH']}")
+    os.environ.update(env)
+    logger.info(f"设置GPT模型路径: {env['GPT_PATH']}")
+    logger.info(f"设置SoVITS模型路径: {env['SOVITS_PATH']}")
+    logger.info(f"设置Vocoder路径: {env['VOCODER_PATH']}")
 
 # 设置环境变量
 set_model_env_vars()
 
-# 创建FastAPI应用
-app = FastAPI(
-    title="GPT-SoVITS API",
-    description="GPT-SoVITS 语音合成 API 接口",
-    version="1.0.0"
-)
-
-# 添加 CORS 中间件
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# 在应用启动时初始化模型
-@app.on_event("startup")
-async def startup_event():
-    """应用启动事件"""
-    logger.info("正在启动 GPT-SoVITS API 服务器...")
-    # 模型初始化将在路由模块中处理
-    logger.info("服务器启动完成")
\ No newline at end of file
+def create_app(config: Optional[dict] = None) -> FastAPI:
+    """创建 GPT-SoVITS FastAPI 应用（独立运行的各入口共用）"""
+    if config is None:
+        config = tts_config
+
+    app = FastAPI(
+        title="GPT-SoVITS API",
+        description="GPT-SoVITS 语音合成 API 接口",
+        version="1.0.0",
+        default_response_class=ORJSONResponse,
+    )
+
+    # 添加 CORS 中间件（不携带凭据，通配符来源可直接返回 *，无需逐请求回显 Origin）
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=False,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.state.tts_config = config
+
+    # 在应用启动时初始化模型
+    @app.on_event("startup")
+    async def startup_event():
+        """应用启动事件"""
+        logger.info("正在启动 GPT-SoVITS API 服务器...")
+        # 模型初始化将在路由模块中处理
+        logger.info("服务器启动完成")
+
+    return app
@@ -2,7 +2,11 @@ import logging
 import os
 import re
 import sys
+import time
 import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from time import time as ttime
 
 import numpy as np
@@ -99,6 +103,7 @@ pretrained_gpt_name = [
 gpt_path = os.environ.get("GPT_PATH", os.path.join(project_root, "GPT_SoVITS/models/GPT_weights_v4/March7-e15.ckpt"))
 sovits_path = os.environ.get("SOVITS_PATH", os.path.join(project_root, "GPT_SoVITS/models/SoVITS_weights_v4/March7_e10_s4750_l32.pth"))
 vocoder_path = os.environ.get("VOCODER_PATH", os.path.join(project_root, "GPT_SoVITS/models/gsv-v4-pretrained/vocoder.pth"))
+bigvgan_path = os.environ.get("BIGVGAN_PATH", os.path.join(project_root, "GPT_SoVITS/models/models--nvidia--bigvgan_v2_24khz_100band_256x"))
 
 # Language mappings
 dict_language_v1 = {
@@ -454,10 +459,7 @@ def change_sovits_weights(sovits_path):
             vq_model.eval()
         
         # 初始化相应的vocoder
-        global hifigan_model, bigvgan_model
-        if model_version == "v4":
-            if hifigan_model is None:
-                init_hifigan()
+        _init_vocoder()
 
         
         print(f"SoVITS model changed to: {sovits_path}")
@@ -700,7 +702,8 @@ def get_specc(hps, ref_wav_path):
 
 def load_models(gpt_path, sovits_path):
     """Load T2S and SoVITS models"""
-    global t2s_model, vq_model, ssl_model, hps, hz, max_sec
+    global t2s_model, ssl_model, hz, max_sec, _active_gpt_key, _active_sovits_key
+    _clear_ref_cache()
     
     # Load T2S model
     dict_s1 = torch.load(gpt_path, map_location=device)
@@ -712,31 +715,24 @@ def load_models(gpt_path, sovits_path):
     if is_half:
         t2s_model = t2s_model.half()
     
-    # Load SoVITS model
-    from process_ckpt import load_sovits_new
-    dict_s2 = load_sovits_new(sovits_path)
-    hps = dict_s2["config"]
-    hps = DictToAttrRecursive(hps)
-    
-    vq_model = SynthesizerTrn(
-        hps.data.filter_length // 2 + 1,
-        hps.train.segment_size // hps.data.hop_length,
-        **hps.model
-    )
-    vq_model.load_state_dict(dict_s2["weight"], strict=False)
-    vq_model = vq_model.to(device).eval()
-    if is_half:
-        vq_model = vq_model.half()
+    # Load SoVITS model（与切换模型使用同一加载流程，包含版本检测，启动时只需加载一次）
+    _load_sovits_weights(sovits_path)
     
     # Load SSL model
     ssl_model = cnhubert.get_model()
     ssl_model = ssl_model.to(device)
     if is_half:
         ssl_model = ssl_model.half()
+    
+    # 记录当前激活的模型，之后切换时可放入最近使用模型缓存
+    _active_gpt_key = _model_cache_key(gpt_path)
+    _active_sovits_key = _model_cache_key(sovits_path)
 
-def change_sovits_weights(sovits_path):
+def _load_sovits_weights(sovits_path):
     """Change SoVITS model weights - 使用与inference_webui.py相同的实现"""
     global vq_model, hps, version, model_version, dict_language, if_lora_v3
+    # 参考音频特征依赖 SoVITS 模型与 hps，切换模型后需要重新计算
+    _clear_ref_cache()
     
     try:
         from peft import LoraConfig, get_peft_model
@@ -831,10 +827,7 @@ def change_sovits_weights(sovits_path):
             vq_model.eval()
         
         # 初始化相应的vocoder
-        global hifigan_model, bigvgan_model
-        if model_version == "v4":
-            if hifigan_model is None:
-                init_hifigan()
+        _init_vocoder()
 
         print(f"SoVITS model changed to: {sovits_path}")
         
@@ -844,7 +837,7 @@ def change_sovits_weights(sovits_path):
         traceback.print_exc()
         raise
 
-def change_gpt_weights(gpt_path):
+def _load_gpt_weights(gpt_path):
     """Change GPT model weights - 使用与inference_webui.py相同的实现"""
     global hz, max_sec, t2s_model, config
     
@@ -871,6 +864,111 @@ def change_gpt_weights(gpt_path):
         traceback.print_exc()
         raise
 
+# 推理与模型切换共用的单线程执行器：对模型全局状态的所有访问都在同一线程中串行执行，
+# 切换模型不会与任何合成（TTS接口或聊天流水线）交错，也不会有两个合成同时占用 GPU
+INFERENCE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+
+# 最近使用模型缓存：切换模型时把被替换的模型移到 CPU 内存保留，再次切回时只需拷贝回推理设备，
+# 无需重新读盘与构建模型。缓存容量由配置项 inference.model_cache_size 通过 set_model_cache_size 设置（0 表示不缓存）
+MODEL_CACHE_SIZE = 2
+_SOVITS_STATE_KEYS = ("vq_model", "hps", "version", "model_version", "dict_language", "if_lora_v3")
+_GPT_STATE_KEYS = ("t2s_model", "hz", "max_sec", "config")
+_sovits_cache = OrderedDict()
+_gpt_cache = OrderedDict()
+_active_sovits_key = None
+_active_gpt_key = None
+
+
+def set_model_cache_size(size):
+    """设置模型缓存容量，非法值（非整数或负数）时保留当前容量；容量缩小时立即淘汰多余的模型"""
+    global MODEL_CACHE_SIZE
+    if isinstance(size, bool) or not isinstance(size, int) or size < 0:
+        print(f"Warning: 模型缓存容量必须为非负整数，忽略配置值: {size!r}")
+        return
+    MODEL_CACHE_SIZE = size
+    for model_cache in (_sovits_cache, _gpt_cache):
+        while len(model_cache) > MODEL_CACHE_SIZE:
+            model_cache.popitem(last=False)
+
+
+def _model_cache_key(path):
+    """模型缓存键：路径与修改时间，权重文件被替换后不会命中旧缓存"""
+    return (os.path.abspath(path), os.path.getmtime(path))
+
+
+def _capture_state(keys):
+    """获取当前激活模型相关的全局状态"""
+    g = globals()
+    return {k: g.get(k) for k in keys}
+
+
+def _stash_model(cache, key, state, model_key):
+    """把被替换下来的模型移到 CPU 并放入缓存，超出容量时淘汰最久未使用的模型"""
+    if key is None or MODEL_CACHE_SIZE <= 0 or state.get(model_key) is None:
+        return
+    state[model_key] = state[model_key].to("cpu")
+    cache[key] = state
+    cache.move_to_end(key)
+    while len(cache) > MODEL_CACHE_SIZE:
+        cache.popitem(last=False)
+    if device == "cuda":
+        torch.cuda.empty_cache()
+
+
+def _restore_model(cache, key, model_key):
+    """从缓存中恢复模型到推理设备并还原其全局状态，未命中时返回 False"""
+    state = cache.pop(key, None)
+    if state is None:
+        return False
+    state[model_key] = state[model_key].to(device)
+    globals().update(state)
+    return True
+
+
+def change_sovits_weights(sovits_path):
+    """切换 SoVITS 模型，最近使用过的模型直接从 CPU 缓存恢复（应在 INFERENCE_EXECUTOR 中调用）"""
+    global _active_sovits_key
+    _clear_ref_cache()
+    key = _model_cache_key(sovits_path)
+    previous_key, previous_state = _active_sovits_key, _capture_state(_SOVITS_STATE_KEYS)
+    try:
+        if key == previous_key:
+            # 重新加载当前模型，不缓存旧实例
+            _load_sovits_weights(sovits_path)
+            return
+        if _restore_model(_sovits_cache, key, "vq_model"):
+            print(f"SoVITS model restored from cache: {sovits_path}")
+            # 缓存中的模型可能与当前 vocoder 版本不同（v3 用 BigVGAN，v4 用 HiFiGAN）
+            _init_vocoder()
+        else:
+            _load_sovits_weights(sovits_path)
+    except BaseException:
+        # 加载过程中可能已改写部分全局变量，失败时还原为切换前的模型
+        globals().update(previous_state)
+        raise
+    _active_sovits_key = key
+    _stash_model(_sovits_cache, previous_key, previous_state, "vq_model")
+
+
+def change_gpt_weights(gpt_path):
+    """切换 GPT 模型，最近使用过的模型直接从 CPU 缓存恢复（应在 INFERENCE_EXECUTOR 中调用）"""
+    global _active_gpt_key
+    key = _model_cache_key(gpt_path)
+    previous_key, previous_state = _active_gpt_key, _capture_state(_GPT_STATE_KEYS)
+    try:
+        if key == previous_key:
+            _load_gpt_weights(gpt_path)
+            return
+        if _restore_model(_gpt_cache, key, "t2s_model"):
+            print(f"GPT model restored from cache: {gpt_path}")
+        else:
+            _load_gpt_weights(gpt_path)
+    except BaseException:
+        globals().update(previous_state)
+        raise
+    _active_gpt_key = key
+    _stash_model(_gpt_cache, previous_key, previous_state, "t2s_model")
+
 # Text cutting functions
 def cut1(inp):
     """Cut text into chunks of 4 sentences"""
@@ -979,6 +1077,8 @@ class WarningHandler:
 # Create a warning handler instance
 warning_handler = WarningHandler()
 
+# 整个推理过程（包括生成器的每次恢复执行）都在 inference_mode 下进行，不记录任何自动求导信息
+@torch.inference_mode()
 def get_tts_wav(
     ref_wav_path,
     prompt_text,
@@ -996,9 +1096,13 @@ def get_tts_wav(
     sample_steps=8,
     if_sr=False,
     pause_second=0.3,
+    stream=False,
 ):
     """
     Core TTS inference function without Gradio dependencies
+
+    stream=True 时每合成完一个切分片段就产出一次 (sr, int16音频)，
+    否则在全部片段合成后一次性产出拼接结果
     """
     global cache
     
@@ -1044,23 +1148,11 @@ def get_tts_wav(
         zero_wav_torch = zero_wav_torch.to(device)
     
     if not ref_free:
-        with torch.no_grad():
-            wav16k, sr = librosa.load(ref_wav_path, sr=16000)
-            if wav16k.shape[0] > 160000 or wav16k.shape[0] < 48000:
-                warning_handler.warning("参考音频在3~10秒范围外，请更换！")
-                return None, None
-            
-            wav16k = torch.from_numpy(wav16k)
-            if is_half:
-                wav16k = wav16k.half().to(device)
-            else:
-                wav16k = wav16k.to(device)
-            wav16k = torch.cat([wav16k, zero_wav_torch])
-            
-            ssl_content = ssl_model.model(wav16k.unsqueeze(0))["last_hidden_state"].transpose(1, 2)
-            codes = vq_model.extract_latent(ssl_content)
-            prompt_semantic = codes[0, 0]
-            prompt = prompt_semantic.unsqueeze(0).to(device)
+        # 参考音频的语义 prompt 按 (路径, 修改时间, 停顿时长) 缓存，同一角色情绪无需重复提取
+        prompt = _get_ref_prompt(ref_wav_path, _ref_mtime(ref_wav_path), pause_second)
+        if prompt is None:
+            warning_handler.warning("参考音频在3~10秒范围外，请更换！")
+            return None, None
 
     t1 = ttime()
     t.append(t1 - t0)
@@ -1086,6 +1178,14 @@ def get_tts_wav(
     texts = merge_short_text_in_array(texts, 5)
     audio_opt = []
     
+    # Output sampling rate based on model version
+    if model_version in {"v1", "v2"}:
+        opt_sr = 32000
+    elif model_version == "v3":
+        opt_sr = 24000
+    else:  # v4
+        opt_sr = 48000
+    
     if not ref_free:
         phones1, bert1, norm_text1 = get_phones_and_bert(prompt_text, prompt_language, version)
     
@@ -1143,14 +1243,14 @@ def get_tts_wav(
                     except:
                         print(f"Error loading reference {path}")
             if len(refers) == 0:
-                refers = [get_spepc(hps, ref_wav_path).to(dtype).to(device)]
+                refers = [_get_ref_spec(ref_wav_path, _ref_mtime(ref_wav_path))]
                 
             audio = vq_model.decode(
                 pred_semantic, torch.LongTensor(phones2).to(device).unsqueeze(0), refers, speed=speed
             )[0][0]
         else:
             # For v3/v4 models - 使用正确的函数调用
-            refer = get_spepc(hps, ref_wav_path).to(device).to(dtype)
+            refer = _get_ref_spec(ref_wav_path, _ref_mtime(ref_wav_path))
             phoneme_ids0 = torch.LongTensor(phones1).to(device).unsqueeze(0)
             phoneme_ids1 = torch.LongTensor(phones2).to(device).unsqueeze(0)
             
@@ -1201,10 +1301,7 @@ def get_tts_wav(
             cfm_res = denorm_spec(cfm_res)
             
             # Initialize vocoder if needed
-            if model_version == "v4":
-                if hifigan_model is None:
-                    init_hifigan()
-                vocoder_model = hifigan_model
+            vocoder_model = _init_vocoder()
                 
             with torch.inference_mode():
                 wav_gen = vocoder_model(cfm_res)
@@ -1214,27 +1311,33 @@ def get_tts_wav(
         max_audio = torch.abs(audio).max()
         if max_audio > 1:
             audio = audio / max_audio
-        audio_opt.append(audio)
-        audio_opt.append(zero_wav_torch)
         
         t4 = ttime()
         t.extend([t2 - t1, t3 - t2, t4 - t3])
         t1 = ttime()
+        
+        if stream:
+            # 流式模式：逐片段产出（含句间停顿），调用方无需等待整段合成
+            segment = torch.cat([audio, zero_wav_torch], 0)
+            yield opt_sr, _to_pcm16(segment)
+            continue
+        audio_opt.append(audio)
+        audio_opt.append(zero_wav_torch)
     
     print("%.3f\t%.3f\t%.3f\t%.3f" % (t[0], sum(t[1::3]), sum(t[2::3]), sum(t[3::3])))
+    if stream:
+        return
     audio_opt = torch.cat(audio_opt, 0)
     
-    # Output sampling rate based on model version
-    if model_version in {"v1", "v2"}:
-        opt_sr = 32000
-    elif model_version == "v3":
-        opt_sr = 24000
-    else:  # v4
-        opt_sr = 48000
-    
-    audio_opt = audio_opt.cpu().detach().numpy()
-    
-    yield opt_sr, (audio_opt * 32767).astype(np.int16)
+    yield opt_sr, _to_pcm16(audio_opt)
+
+def _to_pcm16(audio):
+    """
+    将 [-1, 1] 范围的浮点音频张量转换为 int16 PCM 的 numpy 数组
+
+    缩放与类型转换在推理设备上一次完成，拷回 CPU 的数据量减半，且不在 CPU 上生成浮点中间数组
+    """
+    return (audio.detach() * 32767).to(torch.int16).cpu().numpy()
 
 # Get spectrogram from reference audio - 使用与inference_webui.py相同的函数名get_spepc
 def get_specc(hps, filename):
@@ -1259,6 +1362,63 @@ def get_specc(hps, filename):
 get_spepc = get_specc
 
 
+def t2s_model_is_loaded():
+    """GPT(T2S) 模型是否已加载"""
+    return t2s_model is not None
+
+
+# 参考音频修改时间的缓存有效期（秒），避免每次合成都 stat 参考音频
+_REF_MTIME_TTL = 5.0
+
+
+@lru_cache(maxsize=512)
+def _ref_mtime_cached(ref_wav_path, bucket):
+    return os.path.getmtime(ref_wav_path)
+
+
+def _ref_mtime(ref_wav_path):
+    """参考音频的修改时间，作为缓存键的一部分，文件被替换后缓存自动失效（最多延迟 5 秒）"""
+    return _ref_mtime_cached(ref_wav_path, int(time.monotonic() // _REF_MTIME_TTL))
+
+
+@lru_cache(maxsize=32)
+def _get_ref_prompt(ref_wav_path, mtime, pause_second):
+    """提取参考音频的语义 prompt（位于推理设备上）；时长不在 3~10 秒范围内时返回 None"""
+    with torch.no_grad():
+        wav16k, sr = librosa.load(ref_wav_path, sr=16000)
+        if wav16k.shape[0] > 160000 or wav16k.shape[0] < 48000:
+            return None
+
+        zero_wav_torch = torch.zeros(int(hps.data.sampling_rate * pause_second), dtype=dtype, device=device)
+        wav16k = torch.from_numpy(wav16k).to(dtype).to(device)
+        wav16k = torch.cat([wav16k, zero_wav_torch])
+
+        ssl_content = ssl_model.model(wav16k.unsqueeze(0))["last_hidden_state"].transpose(1, 2)
+        codes = vq_model.extract_latent(ssl_content)
+        prompt_semantic = codes[0, 0]
+        return prompt_semantic.unsqueeze(0).to(device)
+
+
+@lru_cache(maxsize=32)
+def _get_ref_spec(ref_wav_path, mtime):
+    """计算参考音频的线性谱（已转换到推理设备与精度）"""
+    return get_spepc(hps, ref_wav_path).to(dtype).to(device)
+
+
+def _clear_ref_cache():
+    """清空参考音频特征缓存（加载或切换 SoVITS 模型时调用）"""
+    _get_ref_prompt.cache_clear()
+    _get_ref_spec.cache_clear()
+
+
+@torch.inference_mode()
+def preload_ref(ref_wav_path, pause_second=0.3):
+    """预先计算并缓存参考音频特征，避免首个请求承担提取开销"""
+    mtime = _ref_mtime(ref_wav_path)
+    _get_ref_spec(ref_wav_path, mtime)
+    return _get_ref_prompt(ref_wav_path, mtime, pause_second) is not None
+
+
 def init_hifigan():
     """Initialize HiFiGAN vocoder - 使用与inference_webui.py相同的实现"""
     global hifigan_model, bigvgan_model
@@ -1293,3 +1453,39 @@ def init_hifigan():
         hifigan_model = hifigan_model.half().to(device)
     else:
         hifigan_model = hifigan_model.to(device)
+
+
+def init_bigvgan():
+    """Initialize BigVGAN vocoder（v3 模型使用）- 使用与inference_webui.py相同的实现"""
+    global hifigan_model, bigvgan_model
+    from BigVGAN import bigvgan
+
+    bigvgan_model = bigvgan.BigVGAN.from_pretrained(bigvgan_path, use_cuda_kernel=False)
+    bigvgan_model.remove_weight_norm()
+    bigvgan_model = bigvgan_model.eval()
+
+    if hifigan_model:
+        hifigan_model = hifigan_model.cpu()
+        hifigan_model = None
+        try:
+            torch.cuda.empty_cache()
+        except:
+            pass
+
+    if is_half:
+        bigvgan_model = bigvgan_model.half().to(device)
+    else:
+        bigvgan_model = bigvgan_model.to(device)
+
+
+def _init_vocoder():
+    """按当前模型版本确保对应的 vocoder 已加载并返回（v1/v2 不需要 vocoder，返回 None）"""
+    if model_version == "v3":
+        if bigvgan_model is None:
+            init_bigvgan()
+        return bigvgan_model
+    if model_version == "v4":
+        if hifigan_model is None:
+            init_hifigan()
+        return hifigan_model
+    return None
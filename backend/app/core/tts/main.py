@@ -8,12 +8,15 @@ import logging
 import uvicorn
 
 # 导入应用和路由模块
-from app import app, config
+from app.core.tts.app import UVICORN_SERVER_OPTIONS, create_app, server_config, tts_config as config
 from router import router, set_config
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 创建FastAPI应用
+app = create_app(config)
+
 # 设置路由模块的配置
 set_config(config)
 
@@ -31,7 +34,6 @@ if __name__ == "__main__":
     args = parser.parse_args()
     
     # 使用配置文件中的服务器设置，命令行参数优先
-    server_config = config.get("server", {})
     host = args.host or server_config.get("host", "127.0.0.1")
     port = args.port or server_config.get("port", 9880)
     log_level = server_config.get("log_level", "info")
@@ -41,9 +43,10 @@ if __name__ == "__main__":
     logger.info(f"API 文档: http://{host}:{port}/docs")
     
     uvicorn.run(
-        "app:app",
+        "main:app",
         host=host,
         port=port,
         workers=args.workers,
-        log_level=log_level
+        log_level=log_level,
+        **UVICORN_SERVER_OPTIONS,
     )
\ No newline at end of file
@@ -4,24 +4,39 @@ GPT-SoVITS 路由模块
 包含所有API路由和WebSocket端点
 """
 
+import asyncio
 import json
 import logging
 import os
 import sys
+import threading
+import time
 import traceback
 import warnings
-from typing import Optional, List, Union
-import tempfile
+from typing import Optional, List, Tuple, Union
 import base64
 import io
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
 
 import torch
-import torchaudio
+try:
+    import av
+except ImportError:
+    av = None
+try:
+    # SIMD 加速的 Base64 实现，接口与标准库一致
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
 import librosa
 import numpy as np
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, BackgroundTasks
-from fastapi.responses import StreamingResponse, FileResponse
+import orjson
+import soundfile as sf
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response
 from pydantic import BaseModel, Field
 
 # 导入我们的核心推理模块
@@ -31,14 +46,24 @@ from core_inference import (
     load_models,
     change_sovits_weights,
     change_gpt_weights,
-    dict_language
+    dict_language,
+    preload_ref,
+    set_model_cache_size,
+    INFERENCE_EXECUTOR,
 )
 
+# 导入后端配置模块
+from app.config.default import DEFAULT_CONFIG
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
+def _frozen_interned_map(mapping):
+    """构造只读映射，键和值都做字符串驻留（可安全地跨线程共享）"""
+    return MappingProxyType({sys.intern(k): sys.intern(v) for k, v in mapping.items()})
+
 # 英文到中文的参数映射
-LANGUAGE_MAP = {
+LANGUAGE_MAP = _frozen_interned_map({
     "chinese": "中文",
     "english": "英文",
     "japanese": "日文",
@@ -51,16 +76,16 @@ LANGUAGE_MAP = {
     "multilingual": "多语种混合",
     "multilingual_cantonese": "多语种混合(粤语)",
     "auto": "多语种混合"
-}
+})
 
-CUT_METHOD_MAP = {
+CUT_METHOD_MAP = _frozen_interned_map({
     "no_cut": "不切",
     "cut_by_4_sentences": "凑四句一切",
     "cut_by_50_chars": "凑50字一切",
     "cut_by_chinese_period": "按中文句号。切",
     "cut_by_english_period": "按英文句号.切",
     "cut_by_punctuation": "按标点符号切"
-}
+})
 
 def map_language_param(language_en):
     """映射英文语言参数到中文"""
@@ -70,6 +95,198 @@ def map_cut_method_param(cut_method_en):
     """映射英文切分方式参数到中文"""
     return CUT_METHOD_MAP.get(cut_method_en, cut_method_en)
 
+# int16 PCM 归一化到 [-1, 1] 的比例
+_INT16_SCALE = np.float32(1.0 / 32767.0)
+
+
+def _to_audio_tensor(audio_data) -> torch.Tensor:
+    """将合成结果转换为 [1, N] 的 float32 张量（int16 数据一次完成类型转换与缩放）"""
+    if isinstance(audio_data, np.ndarray):
+        samples = np.multiply(audio_data, _INT16_SCALE, dtype=np.float32)
+        return torch.from_numpy(samples).unsqueeze_(0)
+    return audio_data.unsqueeze(0)
+
+
+# Opus 编码器支持的采样率，其余采样率（如 v2 模型的 32kHz）重采样到 48kHz
+_OPUS_SAMPLE_RATES = frozenset((48000, 24000, 16000, 12000, 8000))
+_OPUS_BIT_RATE = 64000
+
+
+def _opus_encoder_available() -> bool:
+    """PyAV 已安装且带有 libopus 编码器时返回 True"""
+    if av is None:
+        return False
+    try:
+        av.codec.Codec("libopus", "w")
+    except ValueError:
+        return False
+    return True
+
+
+# PyAV/libopus 不可用时退回 libsndfile 的 Vorbis 编码（导入时检测一次）
+_opus_available = _opus_encoder_available()
+
+
+def _encode_opus(audio_tensor: torch.Tensor, sr: int) -> Tuple[bytes, int]:
+    """使用 PyAV(libopus) 将音频张量编码为 OGG/Opus 字节，返回 (数据, 编码后的采样率)"""
+    # [1, N] float32，CPU 上的连续张量直接共享内存，不做额外拷贝
+    samples = audio_tensor.detach().cpu().numpy().astype(np.float32, copy=False)
+    rate = sr if sr in _OPUS_SAMPLE_RATES else 48000
+    buffer = io.BytesIO()
+    with av.open(buffer, mode="w", format="ogg") as container:
+        stream = container.add_stream("libopus", rate=rate)
+        stream.layout = "mono"
+        stream.bit_rate = _OPUS_BIT_RATE
+        frame = av.AudioFrame.from_ndarray(samples, format="flt", layout="mono")
+        frame.sample_rate = sr
+        # 编码器内部负责重采样与按 20ms 帧切分
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue(), rate
+
+
+def _encode_ogg(audio_tensor: torch.Tensor, sr: int) -> Tuple[bytes, int]:
+    """
+    将音频张量编码为 OGG 字节，返回 (数据, 编码后的采样率)（同步执行，调用方应放到线程池中）
+
+    优先使用 Opus（编码速度远快于 Vorbis），不可用或本次编码失败时退回 Vorbis
+    """
+    if _opus_available:
+        try:
+            return _encode_opus(audio_tensor, sr)
+        except Exception as e:
+            logger.warning(f"Opus 编码失败，本次改用 Vorbis 编码: {e}")
+    # libsndfile 直接接收 NumPy 数组，无需经由 torchaudio 的后端分派
+    samples = audio_tensor.detach().cpu().numpy()[0]
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sr, format="OGG", subtype="VORBIS")
+    return buffer.getvalue(), sr
+
+
+# /tts 下载响应头（不变量）
+_OGG_DOWNLOAD_HEADERS = {"Content-Disposition": 'attachment; filename="generated_audio.ogg"'}
+
+_GENERATOR_DONE = object()
+
+
+def _run_inference(func, *args):
+    """
+    在推理专用线程中执行 func，返回可等待对象
+
+    推理与模型切换都经由同一个单线程执行器（与聊天流水线的TTS共用），彼此不会并发
+    """
+    return asyncio.get_running_loop().run_in_executor(INFERENCE_EXECUTOR, func, *args)
+
+
+async def _aiter(generator):
+    """将同步推理生成器包装为异步迭代器，每次 next() 都放到推理线程中执行，不阻塞事件循环"""
+    try:
+        while True:
+            item = await _run_inference(next, generator, _GENERATOR_DONE)
+            if item is _GENERATOR_DONE:
+                return
+            yield item
+    finally:
+        # 提前结束（如客户端断开）时在推理线程中关闭生成器，释放其持有的中间结果
+        await _run_inference(generator.close)
+
+
+def _encode_ogg_base64(audio_tensor: torch.Tensor, sr: int) -> Tuple[str, int]:
+    """将音频张量编码为 OGG 并转换为 Base64 字符串，返回 (Base64, 编码后的采样率)（同步执行，调用方应放到线程池中）"""
+    ogg_bytes, rate = _encode_ogg(audio_tensor, sr)
+    return _b64.b64encode(ogg_bytes).decode("ascii"), rate
+
+
+@dataclass(frozen=True)
+class ResolvedTTSParams:
+    """解析后的单次合成参数（角色/情绪对应的参考音频与推理参数）"""
+    character: str
+    mood: str
+    ref_audio_path: Optional[str]
+    prompt_text: str
+    prompt_language: str
+    text_language: str
+    how_to_cut: str
+    top_k: int
+    top_p: float
+    temperature: float
+    ref_free: bool
+    speed: float
+    if_freeze: bool
+    sample_steps: int
+    if_sr: bool
+    pause_second: float
+
+
+@lru_cache(maxsize=256)
+def _resolve_tts_params(
+    character: Optional[str],
+    mood: Optional[str],
+    text_language: Optional[str],
+    how_to_cut: Optional[str],
+) -> ResolvedTTSParams:
+    """根据请求参数与配置解析合成参数；结果按参数组合缓存，配置变化时由 set_config 清空"""
+    # 从配置文件读取推理参数
+    inference_config = config.get("inference", {})
+    # 从全局配置中获取角色配置
+    characters_config = DEFAULT_CONFIG.get("characters", {})
+
+    # 获取默认角色和情绪
+    default_character = character or inference_config.get("default_character", "march7")
+    character_config = characters_config.get(default_character, {})
+
+    if not character_config:
+        # 如果找不到指定角色，使用第一个可用角色
+        if characters_config:
+            default_character = list(characters_config.keys())[0]
+            character_config = characters_config[default_character]
+        else:
+            raise HTTPException(status_code=404, detail="未找到任何角色配置")
+
+    # 获取情绪配置
+    default_mood = mood or character_config.get("default_mood", "normal")
+    moods_config = character_config.get("moods", {})
+    mood_config = moods_config.get(default_mood)
+
+    if not mood_config:
+        # 如果找不到指定情绪，尝试使用normal
+        mood_config = moods_config.get("normal")
+        if not mood_config and moods_config:
+            # 如果连normal都没有，使用第一个可用情绪
+            mood_config = list(moods_config.values())[0]
+        if not mood_config:
+            raise HTTPException(status_code=404, detail=f"角色 {default_character} 未找到情绪配置")
+
+    # 英文参数映射为推理所需的中文参数（未知值原样透传）
+    prompt_language = mood_config.get("language", "chinese")
+    text_language = text_language or inference_config.get("default_language", "chinese")
+    how_to_cut = how_to_cut or inference_config.get("default_how_to_cut", "no_cut")
+
+    return ResolvedTTSParams(
+        character=default_character,
+        mood=default_mood,
+        # 获取参考音频路径和文本
+        ref_audio_path=mood_config.get("audio_path"),
+        prompt_text=mood_config.get("prompt_text", ""),
+        prompt_language=LANGUAGE_MAP.get(prompt_language, prompt_language),
+        # 其他参数从配置文件读取并映射
+        text_language=LANGUAGE_MAP.get(text_language, text_language),
+        how_to_cut=CUT_METHOD_MAP.get(how_to_cut, how_to_cut),
+        # 从配置文件读取固定参数
+        top_k=inference_config.get("default_top_k", 15),
+        top_p=inference_config.get("default_top_p", 1.0),
+        temperature=inference_config.get("default_temperature", 1.0),
+        ref_free=inference_config.get("default_ref_free", False),
+        speed=inference_config.get("default_speed", 1.0),
+        if_freeze=inference_config.get("default_if_freeze", False),
+        sample_steps=inference_config.get("default_sample_steps", 8),
+        if_sr=inference_config.get("default_if_sr", False),
+        pause_second=inference_config.get("default_pause_second", 0.3),
+    )
+
+
 # 数据模型定义
 class TTSRequest(BaseModel):
     """TTS 合成请求模型"""
@@ -111,13 +328,61 @@ current_gpt_path = ""
 model_loaded = False
 config = None  # 将在main.py中设置
 
+# 模型锁：切换模型与推理互斥，避免并发修改 GPU 上的模型状态
+_model_lock = asyncio.Lock()
+# set_config 在同步上下文中调用，使用线程锁防止重复加载默认模型
+_model_load_lock = threading.Lock()
+
+def _iter_ref_audio_paths():
+    """遍历角色配置中所有情绪的参考音频路径（去重）
+
+    路径与聊天流水线的解析方式一致，特征缓存以路径为键，预热结果才能被实际请求命中
+    """
+    # 延迟导入：tts_service 在导入时依赖本模块
+    from app.core.tts.tts_service import _resolve_ref_audio_path
+    seen = set()
+    for character_data in DEFAULT_CONFIG.get("characters", {}).values():
+        for mood_config in character_data.get("moods", {}).values():
+            path = _resolve_ref_audio_path(mood_config.get("audio_path"))
+            if path and path not in seen:
+                seen.add(path)
+                yield path
+
+
+def _preload_ref(path: str, pause_second: float) -> None:
+    """预热单个参考音频的特征缓存，失败时仅记录警告"""
+    try:
+        if not os.path.exists(path):
+            logger.warning(f"参考音频文件不存在，跳过预热: {path}")
+            return
+        if not preload_ref(path, pause_second):
+            logger.warning(f"参考音频时长不在3~10秒范围内: {path}")
+    except Exception as e:
+        logger.warning(f"预热参考音频失败 {path}: {e}")
+
+
+def _preload_ref_audios() -> None:
+    """预热所有已配置参考音频的特征缓存"""
+    pause_second = config.get("inference", {}).get("default_pause_second", 0.3)
+    paths = list(_iter_ref_audio_paths())
+    if not paths:
+        return
+    for path in paths:
+        _preload_ref(path, pause_second)
+    logger.info(f"参考音频特征预热完成，共 {len(paths)} 个")
+
+
 def set_config(global_config):
     """设置全局配置"""
     global config, model_loaded, current_sovits_path, current_gpt_path
     config = global_config
+    _resolve_tts_params.cache_clear()
+    set_model_cache_size(config.get("inference", {}).get("model_cache_size", 2))
     
-    # 如果模型还没有加载，加载默认模型
-    if not model_loaded:
+    # 如果模型还没有加载，加载默认模型（持锁后再检查，避免并发调用重复加载）
+    with _model_load_lock:
+        if model_loaded:
+            return
         try:
             # 获取项目根目录
             project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -142,14 +407,14 @@ def set_config(global_config):
             logger.info(f"正在加载默认模型 - SoVITS: {default_sovits}, GPT: {default_gpt}")
             load_models(default_gpt, default_sovits)
             
-            # 重新加载SoVITS模型以确保正确的模型版本检测
-            from core_inference import change_sovits_weights
-            change_sovits_weights(default_sovits)
-            
             current_sovits_path = default_sovits
             current_gpt_path = default_gpt
             model_loaded = True
             logger.info("TTS模型加载成功")
+
+            # 在推理线程上串行预热各角色情绪的参考音频特征，不与推理争抢 GPU，
+            # 首个请求排在预热之后执行，无需再承担提取开销
+            INFERENCE_EXECUTOR.submit(_preload_ref_audios)
         except Exception as e:
             logger.error(f"加载TTS模型失败: {e}")
             import traceback
@@ -160,45 +425,56 @@ async def switch_models(request: ModelSwitchRequest):
     """切换 SoVITS 或 GPT 模型"""
     global current_sovits_path, current_gpt_path, model_loaded
 
-    try:
-        success_messages = []
-
-        if request.sovits_path:
-            # 检查文件是否存在
-            if not os.path.exists(request.sovits_path):
-                raise HTTPException(status_code=404, detail=f"SoVITS 模型文件不存在: {request.sovits_path}")
-
-            # 更新环境变量
-            os.environ["SOVITS_PATH"] = request.sovits_path
+    if not request.sovits_path and not request.gpt_path:
+        raise HTTPException(status_code=400, detail="请至少指定一个模型路径")
 
-            logger.info(f"切换 SoVITS 模型到: {request.sovits_path}")
-            change_sovits_weights(request.sovits_path)
-            current_sovits_path = request.sovits_path
-            success_messages.append(f"SoVITS 模型切换成功: {request.sovits_path}")
-
-            # 更新配置文件
-            config["default_models"]["sovits_path"] = request.sovits_path
-
-        if request.gpt_path:
-            # 检查文件是否存在
-            if not os.path.exists(request.gpt_path):
-                raise HTTPException(status_code=404, detail=f"GPT 模型文件不存在: {request.gpt_path}")
-
-            # 更新环境变量
-            os.environ["GPT_PATH"] = request.gpt_path
-
-            logger.info(f"切换 GPT 模型到: {request.gpt_path}")
-            change_gpt_weights(request.gpt_path)
-            current_gpt_path = request.gpt_path
-            success_messages.append(f"GPT 模型切换成功: {request.gpt_path}")
-
-            # 更新配置文件
-            config["default_models"]["gpt_path"] = request.gpt_path
-
-        if not request.sovits_path and not request.gpt_path:
-            raise HTTPException(status_code=400, detail="请至少指定一个模型路径")
+    try:
+        # 切换期间不允许合成请求使用模型，并发的切换请求也依次执行
+        async with _model_lock:
+            success_messages = []
+
+            if request.sovits_path:
+                if request.sovits_path == current_sovits_path:
+                    # 与当前模型相同，无需重新加载
+                    success_messages.append(f"SoVITS 模型已是当前模型: {request.sovits_path}")
+                else:
+                    # 检查文件是否存在
+                    if not os.path.exists(request.sovits_path):
+                        raise HTTPException(status_code=404, detail=f"SoVITS 模型文件不存在: {request.sovits_path}")
+
+                    # 更新环境变量
+                    os.environ["SOVITS_PATH"] = request.sovits_path
+
+                    logger.info(f"切换 SoVITS 模型到: {request.sovits_path}")
+                    # 权重加载耗时较长，放到推理线程中执行，避免阻塞事件循环，也不会与进行中的合成交错
+                    await _run_inference(change_sovits_weights, request.sovits_path)
+                    current_sovits_path = request.sovits_path
+                    success_messages.append(f"SoVITS 模型切换成功: {request.sovits_path}")
+
+                    # 更新配置文件
+                    config["default_models"]["sovits_path"] = request.sovits_path
+
+            if request.gpt_path:
+                if request.gpt_path == current_gpt_path:
+                    # 与当前模型相同，无需重新加载
+                    success_messages.append(f"GPT 模型已是当前模型: {request.gpt_path}")
+                else:
+                    # 检查文件是否存在
+                    if not os.path.exists(request.gpt_path):
+                        raise HTTPException(status_code=404, detail=f"GPT 模型文件不存在: {request.gpt_path}")
+
+                    # 更新环境变量
+                    os.environ["GPT_PATH"] = request.gpt_path
+
+                    logger.info(f"切换 GPT 模型到: {request.gpt_path}")
+                    await _run_inference(change_gpt_weights, request.gpt_path)
+                    current_gpt_path = request.gpt_path
+                    success_messages.append(f"GPT 模型切换成功: {request.gpt_path}")
+
+                    # 更新配置文件
+                    config["default_models"]["gpt_path"] = request.gpt_path
 
-        model_loaded = True
+            model_loaded = True
 
         return {
             "message": "; ".join(success_messages),
@@ -230,9 +506,88 @@ async def get_model_status():
         "gpt_exists": os.path.exists(current_gpt_path) if current_gpt_path else False
     }
 
+# 参考音频存在性检查结果的有效期（秒），热路径上不必每个请求都 stat 一次
+_REF_STAT_TTL = 5.0
+
+
+@lru_cache(maxsize=512)
+def _ref_audio_exists(path: str, bucket: int) -> bool:
+    """检查参考音频是否存在；bucket 为时间桶编号，桶变化即缓存过期"""
+    return os.path.exists(path)
+
+
+def _prepare_tts_params(
+    character: Optional[str],
+    mood: Optional[str],
+    text_language: Optional[str],
+    how_to_cut: Optional[str],
+) -> ResolvedTTSParams:
+    """检查模型状态并解析本次合成参数，参考音频不存在时抛出 404"""
+    # 检查模型是否已加载
+    if not model_loaded:
+        raise HTTPException(status_code=503, detail="模型尚未加载，请先切换模型或重启服务")
+
+    # 解析角色、情绪与推理参数（按请求参数缓存）
+    params = _resolve_tts_params(character, mood, text_language, how_to_cut)
+    ref_audio_path = params.ref_audio_path
+
+    if not ref_audio_path or not _ref_audio_exists(ref_audio_path, int(time.monotonic() // _REF_STAT_TTL)):
+        raise HTTPException(status_code=404, detail=f"参考音频文件不存在: {ref_audio_path}")
+
+    logger.info(f"使用角色: {params.character}, 情绪: {params.mood}, 参考音频: {ref_audio_path}")
+    return params
+
+
+def _run_tts(text: str, params: ResolvedTTSParams, stream: bool = False):
+    """以解析好的参数调用推理函数，返回 (sr, int16音频) 生成器"""
+    return get_tts_wav(
+        ref_wav_path=params.ref_audio_path,
+        prompt_text=params.prompt_text,
+        prompt_language=params.prompt_language,
+        text=text,
+        text_language=params.text_language,
+        how_to_cut=params.how_to_cut,
+        top_k=params.top_k,
+        top_p=params.top_p,
+        temperature=params.temperature,
+        ref_free=params.ref_free,
+        speed=params.speed,
+        if_freeze=params.if_freeze,
+        inp_refs=None,  # 简化版本，不支持多个参考音频
+        sample_steps=params.sample_steps,
+        if_sr=params.if_sr,
+        pause_second=params.pause_second,
+        stream=stream,
+    )
+
+
+async def _synthesize_tts(
+    text: str,
+    character: Optional[str],
+    mood: Optional[str],
+    text_language: Optional[str],
+    how_to_cut: Optional[str],
+) -> Tuple[ResolvedTTSParams, int, torch.Tensor]:
+    """
+    两个合成接口共用的流水线：解析参数 -> 推理 -> 转换为 [1, N] float32 张量
+
+    Returns:
+        (解析后的参数, 采样率, 音频张量)
+    """
+    params = _prepare_tts_params(character, mood, text_language, how_to_cut)
+
+    # 推理在推理线程中执行，不阻塞事件循环；持模型锁，期间不会发生模型切换
+    async with _model_lock:
+        sr, audio_data = await _run_inference(next, _run_tts(text, params), (None, None))
+
+    if sr is None or audio_data is None:
+        raise HTTPException(status_code=500, detail="音频生成失败")
+
+    return params, sr, _to_audio_tensor(audio_data)
+
+
 @router.post("/tts", summary="语音合成")
 async def text_to_speech(
-    background_tasks: BackgroundTasks,
     text: str = Form(..., description="需要合成的文本"),
     character: str = Form(None, description="角色名称"),
     mood: str = Form(None, description="情绪"),
@@ -249,124 +604,16 @@ async def text_to_speech(
     - **how_to_cut**: 文本切分方式（可选，默认使用配置文件）
     """
     try:
-        # 检查模型是否已加载
-        if not model_loaded:
-            raise HTTPException(status_code=503, detail="模型尚未加载，请先切换模型或重启服务")
+        _, sr, audio_tensor = await _synthesize_tts(text, character, mood, text_language, how_to_cut)
 
-        # 从配置文件读取推理参数
-        inference_config = config.get("inference", {})
-        
-        # 从全局配置中获取角色配置
-        from app.config.default import DEFAULT_CONFIG
-        global_config = DEFAULT_CONFIG
-        characters_config = global_config.get("characters", {})
-
-        # 获取默认角色和情绪
-        default_character = character or inference_config.get("default_character", "march7")
-        character_config = characters_config.get(default_character, {})
-
-        if not character_config:
-            # 如果找不到指定角色，使用第一个可用角色
-            if characters_config:
-                default_character = list(characters_config.keys())[0]
-                character_config = characters_config[default_character]
-            else:
-                raise HTTPException(status_code=404, detail="未找到任何角色配置")
-
-        # 获取情绪配置
-        default_mood = mood or character_config.get("default_mood", "normal")
-        moods_config = character_config.get("moods", {})
-        mood_config = moods_config.get(default_mood)
-
-        if not mood_config:
-            # 如果找不到指定情绪，尝试使用normal
-            mood_config = moods_config.get("normal")
-            if not mood_config and moods_config:
-                # 如果连normal都没有，使用第一个可用情绪
-                mood_config = list(moods_config.values())[0]
-            if not mood_config:
-                raise HTTPException(status_code=404, detail=f"角色 {default_character} 未找到情绪配置")
-
-        # 获取参考音频路径和文本
-        ref_audio_path = mood_config.get("audio_path")
-        prompt_text = mood_config.get("prompt_text", "")
-        prompt_language_en = mood_config.get("language", "chinese")
-        prompt_language = map_language_param(prompt_language_en)
-
-        if not ref_audio_path or not os.path.exists(ref_audio_path):
-            raise HTTPException(status_code=404, detail=f"参考音频文件不存在: {ref_audio_path}")
-
-        # 其他参数从配置文件读取并映射
-        text_language_en = text_language or inference_config.get("default_language", "chinese")
-        text_language = map_language_param(text_language_en)
-
-        how_to_cut_en = how_to_cut or inference_config.get("default_how_to_cut", "no_cut")
-        how_to_cut = map_cut_method_param(how_to_cut_en)
-
-        # 从配置文件读取固定参数
-        top_k = inference_config.get("default_top_k", 15)
-        top_p = inference_config.get("default_top_p", 1.0)
-        temperature = inference_config.get("default_temperature", 1.0)
-        ref_free = inference_config.get("default_ref_free", False)
-        speed = inference_config.get("default_speed", 1.0)
-        if_freeze = inference_config.get("default_if_freeze", False)
-        sample_steps = inference_config.get("default_sample_steps", 8)
-        if_sr = inference_config.get("default_if_sr", False)
-        pause_second = inference_config.get("default_pause_second", 0.3)
-
-        logger.info(f"使用角色: {default_character}, 情绪: {default_mood}, 参考音频: {ref_audio_path}")
-
-        # 调用我们的 TTS 函数
-        result_generator = get_tts_wav(
-            ref_wav_path=ref_audio_path,
-            prompt_text=prompt_text,
-            prompt_language=prompt_language,
-            text=text,
-            text_language=text_language,
-            how_to_cut=how_to_cut,
-            top_k=top_k,
-            top_p=top_p,
-            temperature=temperature,
-            ref_free=ref_free,
-            speed=speed,
-            if_freeze=if_freeze,
-            inp_refs=None,  # 简化版本，不支持多个参考音频
-            sample_steps=sample_steps,
-            if_sr=if_sr,
-            pause_second=pause_second,
-        )
-
-        # 获取生成的音频
-        sr, audio_data = next(result_generator)
-
-        if sr is None or audio_data is None:
-            raise HTTPException(status_code=500, detail="音频生成失败")
-
-        # 将音频数据保存到临时文件（OGG）
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".ogg") as temp_output:
-            # 确保音频数据是正确的格式
-            if isinstance(audio_data, np.ndarray):
-                # 转换为 torch tensor
-                audio_tensor = torch.from_numpy(audio_data.astype(np.float32)) / 32767.0
-            else:
-                audio_tensor = audio_data
-            # 保存音频文件为ogg
-            torchaudio.save(temp_output.name, audio_tensor.unsqueeze(0), sr, format="ogg", encoding="vorbis")
-            output_path = temp_output.name
-        # 定义清理函数
-        def cleanup_files():
-            try:
-                if os.path.exists(output_path):
-                    os.unlink(output_path)
-            except Exception as e:
-                logger.warning(f"清理临时文件失败: {e}")
-        # 添加后台任务来清理文件
-        background_tasks.add_task(cleanup_files)
+        # 在内存中编码为 OGG 直接返回，无需落盘再读取与清理临时文件
+        # Vorbis 编码为CPU密集型同步操作，放到线程池中执行，避免阻塞事件循环
+        ogg_bytes, _ = await asyncio.to_thread(_encode_ogg, audio_tensor, sr)
         # 返回音频文件（OGG）
-        return FileResponse(
-            output_path,
+        return Response(
+            content=ogg_bytes,
             media_type="audio/ogg",
-            filename="generated_audio.ogg"
+            headers=_OGG_DOWNLOAD_HEADERS,
         )
 
     except HTTPException:
@@ -394,114 +641,16 @@ async def text_to_speech_base64(
     - **how_to_cut**: 文本切分方式（可选，默认使用配置文件）
     """
     try:
-        # 检查模型是否已加载
-        if not model_loaded:
-            raise HTTPException(status_code=503, detail="模型尚未加载，请先切换模型或重启服务")
-
-        # 从配置文件读取推理参数
-        inference_config = config.get("inference", {})
-        
-        # 从全局配置中获取角色配置
-        from app.config.default import DEFAULT_CONFIG
-        global_config = DEFAULT_CONFIG
-        characters_config = global_config.get("characters", {})
-
-        # 获取默认角色和情绪
-        default_character = character or inference_config.get("default_character", "march7")
-        character_config = characters_config.get(default_character, {})
-
-        if not character_config:
-            # 如果找不到指定角色，使用第一个可用角色
-            if characters_config:
-                default_character = list(characters_config.keys())[0]
-                character_config = characters_config[default_character]
-            else:
-                raise HTTPException(status_code=404, detail="未找到任何角色配置")
-
-        # 获取情绪配置
-        default_mood = mood or character_config.get("default_mood", "normal")
-        moods_config = character_config.get("moods", {})
-        mood_config = moods_config.get(default_mood)
-
-        if not mood_config:
-            # 如果找不到指定情绪，尝试使用normal
-            mood_config = moods_config.get("normal")
-            if not mood_config and moods_config:
-                # 如果连normal都没有，使用第一个可用情绪
-                mood_config = list(moods_config.values())[0]
-            if not mood_config:
-                raise HTTPException(status_code=404, detail=f"角色 {default_character} 未找到情绪配置")
-
-        # 获取参考音频路径和文本
-        ref_audio_path = mood_config.get("audio_path")
-        prompt_text = mood_config.get("prompt_text", "")
-        prompt_language_en = mood_config.get("language", "chinese")
-        prompt_language = map_language_param(prompt_language_en)
-
-        if not ref_audio_path or not os.path.exists(ref_audio_path):
-            raise HTTPException(status_code=404, detail=f"参考音频文件不存在: {ref_audio_path}")
-
-        # 其他参数从配置文件读取并映射
-        text_language_en = text_language or inference_config.get("default_language", "chinese")
-        text_language = map_language_param(text_language_en)
-
-        how_to_cut_en = how_to_cut or inference_config.get("default_how_to_cut", "no_cut")
-        how_to_cut = map_cut_method_param(how_to_cut_en)
-
-        # 从配置文件读取固定参数
-        top_k = inference_config.get("default_top_k", 15)
-        top_p = inference_config.get("default_top_p", 1.0)
-        temperature = inference_config.get("default_temperature", 1.0)
-        ref_free = inference_config.get("default_ref_free", False)
-        speed = inference_config.get("default_speed", 1.0)
-        if_freeze = inference_config.get("default_if_freeze", False)
-        sample_steps = inference_config.get("default_sample_steps", 8)
-        if_sr = inference_config.get("default_if_sr", False)
-        pause_second = inference_config.get("default_pause_second", 0.3)
-
-        logger.info(f"使用角色: {default_character}, 情绪: {default_mood}, 参考音频: {ref_audio_path}")
-
-        # 调用我们的 TTS 函数
-        result_generator = get_tts_wav(
-            ref_wav_path=ref_audio_path,
-            prompt_text=prompt_text,
-            prompt_language=prompt_language,
-            text=text,
-            text_language=text_language,
-            how_to_cut=how_to_cut,
-            top_k=top_k,
-            top_p=top_p,
-            temperature=temperature,
-            ref_free=ref_free,
-            speed=speed,
-            if_freeze=if_freeze,
-            inp_refs=None,  # 简化版本，不支持多个参考音频
-            sample_steps=sample_steps,
-            if_sr=if_sr,
-            pause_second=pause_second,
-        )
+        params, sr, audio_tensor = await _synthesize_tts(text, character, mood, text_language, how_to_cut)
 
-        # 获取生成的音频
-        sr, audio_data = next(result_generator)
-
-        if sr is None or audio_data is None:
-            raise HTTPException(status_code=500, detail="音频生成失败")
-
-        # 将音频数据转换为 Base64 (OGG)
-        buffer = io.BytesIO()
-        if isinstance(audio_data, np.ndarray):
-            audio_tensor = torch.from_numpy(audio_data.astype(np.float32)) / 32767.0
-        else:
-            audio_tensor = audio_data
-        torchaudio.save(buffer, audio_tensor.unsqueeze(0), sr, format="ogg", encoding="vorbis")
-        buffer.seek(0)
-        # 编码为 Base64
-        audio_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        # 将音频数据转换为 Base64 (OGG)，编码与 Base64 转换在同一次线程池调用中完成
+        # 采样率以实际编码结果为准（Opus 会把不支持的采样率重采样到 48kHz）
+        audio_base64, encoded_sr = await asyncio.to_thread(_encode_ogg_base64, audio_tensor, sr)
         return {
             "audio_base64": audio_base64,
-            "sample_rate": sr,
-            "character": default_character,
-            "mood": default_mood,
+            "sample_rate": encoded_sr,
+            "character": params.character,
+            "mood": params.mood,
             "audio_format": "ogg",
             "message": "合成成功"
         }
@@ -513,14 +662,70 @@ async def text_to_speech_base64(
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"TTS 合成失败: {str(e)}")
 
+
+async def _send_json(websocket: WebSocket, data: dict) -> None:
+    """以文本帧发送 JSON，使用 orjson 序列化（C 实现），比 Starlette 默认的 json.dumps 更快"""
+    await websocket.send_text(orjson.dumps(data).decode("utf-8"))
+
+
+@router.websocket("/tts/stream")
+async def text_to_speech_stream(websocket: WebSocket):
+    """
+    流式语音合成（WebSocket）
+
+    客户端发送 JSON：{"text": ..., "character": ..., "mood": ..., "text_language": ..., "how_to_cut": ...}
+    服务端按切分片段逐段合成，每段先发送 JSON 头 {"seq", "sr", "final": false}，
+    再发送该段的 OGG 二进制数据；全部完成后发送 {"final": true}
+    """
+    await websocket.accept()
+    try:
+        while True:
+            request = orjson.loads(await websocket.receive_text())
+            try:
+                text = request.get("text")
+                if not text:
+                    raise HTTPException(status_code=400, detail="需要合成的文本不能为空")
+
+                params = _prepare_tts_params(
+                    request.get("character"),
+                    request.get("mood"),
+                    request.get("text_language"),
+                    request.get("how_to_cut"),
+                )
+
+                # 每合成完一个片段立即编码并下发，首包延迟从整段合成时间降为首句合成时间
+                # 整段合成期间持模型锁：模型切换需等待进行中的合成完成，同一句话不会被不同模型的音色拼接
+                seq = 0
+                async with _model_lock:
+                    async for sr, audio_data in _aiter(_run_tts(text, params, stream=True)):
+                        if sr is None or audio_data is None:
+                            continue
+                        audio_tensor = _to_audio_tensor(audio_data)
+                        ogg_bytes, encoded_sr = await asyncio.to_thread(_encode_ogg, audio_tensor, sr)
+                        await _send_json(websocket, {"seq": seq, "sr": encoded_sr, "final": False})
+                        await websocket.send_bytes(ogg_bytes)
+                        seq += 1
+
+                await _send_json(websocket, {"seq": seq, "final": True})
+
+            except HTTPException as e:
+                await _send_json(websocket, {"error": e.detail, "status_code": e.status_code, "final": True})
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.error(f"流式 TTS 合成失败: {str(e)}")
+                logger.error(traceback.format_exc())
+                await _send_json(websocket, {"error": f"TTS 合成失败: {str(e)}", "final": True})
+
+    except WebSocketDisconnect:
+        logger.info("流式 TTS 客户端断开连接")
+
 @router.get("/characters", summary="获取角色和情绪列表")
 async def get_characters():
     """获取可用的角色和情绪列表"""
     try:
         # 从全局配置中获取角色配置
-        from app.config.default import DEFAULT_CONFIG
-        global_config = DEFAULT_CONFIG
-        characters_config = global_config.get("characters", {})
+        characters_config = DEFAULT_CONFIG.get("characters", {})
         result = {}
 
         for character_name, character_data in characters_config.items():
@@ -1,22 +1,35 @@
 import asyncio
 import os
+import struct
 import sys
 import tempfile
-import json
+import time
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, List, Mapping, Optional, Tuple
+import numpy as np
 from loguru import logger
 
 from ... import app_config
 
+# 参考音频相对路径的解析基准目录（导入时计算一次）
+_MODULE_DIR = Path(__file__).resolve().parent
+_BACKEND_DIR = _MODULE_DIR.parent.parent.parent
+_PROJECT_ROOT = _BACKEND_DIR.parent
+
 # 添加GSVI路径到sys.path
-tts_path = Path(__file__).parent.parent / "tts"
+tts_path = Path(__file__).parent
 if str(tts_path) not in sys.path:
     sys.path.insert(0, str(tts_path))
 
 # 导入GSVI核心推理模块
 try:
-    from core_inference import get_tts_wav, load_models, dict_language
-    from router import map_language_param, map_cut_method_param
+    # TTS 推理专用线程：与 TTS 路由共用，既不阻塞事件循环，又保证模型的推理与切换串行执行
+    from core_inference import (
+        get_tts_wav, load_models, dict_language, t2s_model_is_loaded, INFERENCE_EXECUTOR as _TTS_EXECUTOR,
+    )
+    from router import LANGUAGE_MAP, CUT_METHOD_MAP, _REF_STAT_TTL, _ref_audio_exists
     GSVI_AVAILABLE = True
 except ImportError as e:
     logger.warning(f"无法导入GSVI模块: {e}")
@@ -25,30 +38,55 @@ except ImportError as e:
 # 全局配置变量
 config = None
 
+def _resolve_ref_audio_path(audio_path: Optional[str]) -> Optional[str]:
+    """将参考音频路径解析为绝对路径：以 backend/ 开头的相对路径基于项目根目录，其余基于 backend 目录"""
+    if not audio_path or os.path.isabs(audio_path):
+        return audio_path
+    base_dir = _PROJECT_ROOT if audio_path.startswith("backend/") else _BACKEND_DIR
+    return str(base_dir / audio_path)
+
+
+def _resolve_characters(characters_config: Mapping) -> dict:
+    """
+    复制角色配置，并预先把各情绪的参考音频路径解析为绝对路径
+
+    在配置加载时执行一次，缺失的参考音频在启动时即报告，而不是等到合成请求时
+    """
+    characters = {}
+    for name, character_config in characters_config.items():
+        moods = {}
+        for mood_name, mood_config in character_config.get("moods", {}).items():
+            audio_path = _resolve_ref_audio_path(mood_config.get("audio_path"))
+            if audio_path and not os.path.exists(audio_path):
+                logger.warning(f"角色 {name} 情绪 {mood_name} 的参考音频不存在: {audio_path}")
+            moods[mood_name] = {**mood_config, "audio_path": audio_path}
+        characters[name] = {**character_config, "moods": moods}
+    return characters
+
+
 def set_tts_config(global_config):
     """设置TTS配置"""
     global config
-    config = global_config
+    config = {**global_config, "characters": _resolve_characters(global_config.get("characters", {}))}
+    _resolve_synthesis_kwargs.cache_clear()
 
 def load_tts_config():
     """加载TTS配置文件"""
     global config
-    logger.info(f"load_tts_config called, global config is None: {config is None}")
+    # 已缓存时直接返回，不做任何日志格式化（每个TTS文本块都会调用）
     if config is not None:
-        logger.info(f"Returning cached config, has characters: {'characters' in config}")
         return config
 
     try:
-        from ...config.app_config import AppConfig
-        app_config = AppConfig()
-        
-        # 从统一配置中获取TTS相关配置
+        # 从统一配置（全局 app_config 实例，不再重新构建一份）中获取TTS相关配置
         tts_config = app_config.get("tts_config", {})
         characters_config = app_config.get("characters", {})
         pretrained_models = app_config.get("pretrained_models", {})
         
-        logger.info(f"从统一配置加载 - tts_config: {bool(tts_config)}, characters_config: {bool(characters_config)}, pretrained_models: {bool(pretrained_models)}")
-        logger.info(f"characters keys: {list(characters_config.keys()) if characters_config else 'None'}")
+        logger.debug(
+            "从统一配置加载 - tts_config: {}, characters_config: {}, pretrained_models: {}",
+            bool(tts_config), bool(characters_config), bool(pretrained_models),
+        )
         
         # 验证必需的配置项
         if not tts_config.get("default_character"):
@@ -74,198 +112,338 @@ def load_tts_config():
                 "default_if_sr": tts_config.get("default_if_sr", False),
                 "default_pause_second": tts_config.get("default_pause_second", 0.3)
             },
-            "characters": characters_config,
+            "characters": _resolve_characters(characters_config),
             "default_models": {
                 "sovits_path": pretrained_models.get("sovits_v4"),
                 "gpt_path": pretrained_models.get("gpt_v4")
             }
         }
-        logger.info("从统一配置加载TTS配置成功")
-        logger.info(f"角色配置: {list(characters_config.keys()) if characters_config else '空'}")
+        logger.debug("从统一配置加载TTS配置成功，角色配置: {}", list(characters_config))
         return config
     except Exception as e:
         logger.warning(f"无法从统一配置加载配置，使用全局配置: {e}")
         
     # 如果统一配置加载失败，使用全局配置（如果已设置）
     if config is not None:
-        logger.info("使用全局TTS配置")
+        logger.debug("使用全局TTS配置")
         return config
         
     # 如果都没有，抛出错误
     raise RuntimeError("无法加载TTS配置: 未找到有效的配置源")
 
 
-async def text_to_speech_stream(text_chunk: str, character: str = None, mood: str = None):
+
+
+def _ensure_models_loaded(tts_config) -> bool:
+    """确保TTS模型已加载（同步执行，在TTS线程中调用），失败时返回 False"""
+    if t2s_model_is_loaded():
+        return True
+
+    # 加载默认模型
+    default_models = tts_config.get("default_models", {})
+    sovits_path = default_models.get("sovits_path")
+    gpt_path = default_models.get("gpt_path")
+
+    if not sovits_path or not gpt_path:
+        logger.error("config.json 中必须指定 pretrained_models.sovits_v4 和 pretrained_models.gpt_v4")
+        return False
+
+    if os.path.exists(sovits_path) and os.path.exists(gpt_path):
+        logger.info(f"加载TTS模型: SoVITS={sovits_path}, GPT={gpt_path}")
+        load_models(gpt_path, sovits_path)
+        return True
+
+    logger.error(f"TTS模型文件不存在: SoVITS={sovits_path}, GPT={gpt_path}")
+    return False
+
+
+def _run_tts_sync(**kwargs):
     """
-    异步调用TTS服务进行语音合成，并返回音频数据。
+    执行一次语音合成并封装为 WAV（同步执行，在TTS线程中调用）
 
-    Args:
-        text_chunk (str): 需要合成的文本块。
-        character (str): 角色名称，如果为None则使用配置中的默认值。
-        mood (str): 情绪，如果为None则使用配置中的默认值。
+    Returns:
+        (sample_rate, wav_bytes)，合成失败时返回 None
+    """
+    # 获取生成的音频
+    sr, audio_data = next(get_tts_wav(**kwargs), (None, None))
+
+    if sr is None or audio_data is None:
+        return None
+
+    return sr, _encode_wav(audio_data, sr)
+
+
+# 16-bit 单声道 PCM WAV 文件头（RIFF/WAVE + fmt + data，共 44 字节）
+_WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+
+
+def _encode_wav(audio_data: np.ndarray, sr: int) -> bytes:
+    """将合成结果直接封装为 16-bit PCM WAV 字节，int16 数据无需任何转换"""
+    if audio_data.dtype != np.int16:
+        # 浮点数据一次完成缩放、裁剪与类型转换
+        audio_data = np.clip(audio_data * 32767, -32768, 32767).astype(np.int16)
+    pcm = audio_data.tobytes()
+    header = _WAV_HEADER.pack(
+        b"RIFF", 36 + len(pcm), b"WAVE",
+        b"fmt ", 16, 1, 1, sr, sr * 2, 2, 16,
+        b"data", len(pcm),
+    )
+    return header + pcm
+
+
+@lru_cache(maxsize=64)
+def _resolve_synthesis_kwargs(character: str = None, mood: str = None):
+    """
+    根据配置解析角色、情绪与推理参数
+
+    结果按 (角色, 情绪) 缓存，同一会话的后续文本块无需重复解析；配置变化时由 set_tts_config 清空
 
     Returns:
-        tuple: (sample_rate, audio_data) 或 None如果失败
+        (角色名, 情绪名, get_tts_wav 的只读参数映射（不含 text）)，配置无效时返回 None
     """
-    if not GSVI_AVAILABLE:
-        logger.warning("GSVI模块不可用，跳过语音合成。")
-        return
+    tts_config = load_tts_config()
+    inference_config = tts_config.get("inference", {})
+    characters_config = tts_config.get("characters", {})
+
+    logger.info(f"TTS配置加载: characters_config keys = {list(characters_config.keys()) if characters_config else 'None'}")
+    logger.info(f"默认角色: {inference_config['default_character']}")
 
+    # 获取默认角色和情绪
+    default_character = character or inference_config["default_character"]
+    character_config = characters_config.get(default_character, {})
+
+    logger.info(f"查找角色 '{default_character}': {bool(character_config)}")
+
+    if not character_config:
+        logger.error(f"未找到角色配置: {default_character}")
+        logger.error(f"可用角色: {list(characters_config.keys()) if characters_config else 'None'}")
+        return None
+
+    # 获取情绪配置
+    default_mood = mood or character_config.get("default_mood", inference_config["default_mood"])
+    moods_config = character_config.get("moods", {})
+    mood_config = moods_config.get(default_mood)
+
+    if not mood_config:
+        # 如果找不到指定情绪，尝试使用normal
+        mood_config = moods_config.get("normal")
+        if not mood_config and moods_config:
+            # 如果连normal都没有，使用第一个可用情绪
+            mood_config = list(moods_config.values())[0]
+        if not mood_config:
+            logger.error(f"角色 {default_character} 未找到情绪配置")
+            return None
+
+    # 获取参考音频路径和文本（路径已在配置加载时解析为绝对路径）
+    ref_audio_path = str(mood_config.get("audio_path"))
+    prompt_text = mood_config.get("prompt_text", "")
+    prompt_language_en = mood_config.get("language", "chinese")
+    prompt_language = LANGUAGE_MAP.get(prompt_language_en, prompt_language_en)
+
+    # 其他参数从配置文件读取并映射
+    text_language_en = inference_config.get("default_language", "chinese")
+    text_language = LANGUAGE_MAP.get(text_language_en, text_language_en)
+
+    how_to_cut_en = inference_config.get("default_how_to_cut", "no_cut")
+    how_to_cut = CUT_METHOD_MAP.get(how_to_cut_en, how_to_cut_en)
+
+    # 从配置文件读取固定参数
+    top_k = inference_config.get("default_top_k", 15)
+    top_p = inference_config.get("default_top_p", 1.0)
+    temperature = inference_config.get("default_temperature", 1.0)
+    ref_free = inference_config.get("default_ref_free", False)
+    speed = inference_config.get("default_speed", 1.0)
+    if_freeze = inference_config.get("default_if_freeze", False)
+    sample_steps = inference_config.get("default_sample_steps", 8)
+    if_sr = inference_config.get("default_if_sr", False)
+    pause_second = inference_config.get("default_pause_second", 0.3)
+
+    logger.info(f"使用角色: {default_character}, 情绪: {default_mood}, 参考音频: {ref_audio_path}")
+
+    return default_character, default_mood, MappingProxyType({
+        "ref_wav_path": ref_audio_path,
+        "prompt_text": prompt_text,
+        "prompt_language": prompt_language,
+        "text_language": text_language,
+        "how_to_cut": how_to_cut,
+        "top_k": top_k,
+        "top_p": top_p,
+        "temperature": temperature,
+        "ref_free": ref_free,
+        "speed": speed,
+        "if_freeze": if_freeze,
+        "inp_refs": None,
+        "sample_steps": sample_steps,
+        "if_sr": if_sr,
+        "pause_second": pause_second,
+    })
+
+
+def _run_tts_chunk_sync(text_chunk: str, synthesis_kwargs: Mapping):
+    """在TTS线程中合成单个文本块，失败时返回 None，不影响同批的其余文本块"""
     try:
-        # 加载配置
-        tts_config = load_tts_config()
-        inference_config = tts_config.get("inference", {})
-        characters_config = tts_config.get("characters", {})
+        return _run_tts_sync(text=text_chunk, **synthesis_kwargs)
+    except Exception as e:
+        logger.error(f"合成文本块失败 '{text_chunk}': {e}")
+        return None
 
-        logger.info(f"TTS配置加载: characters_config keys = {list(characters_config.keys()) if characters_config else 'None'}")
-        logger.info(f"默认角色: {inference_config['default_character']}")
 
-        # 获取默认角色和情绪
-        default_character = character or inference_config["default_character"]
-        character_config = characters_config.get(default_character, {})
+async def _prepare_synthesis(character: str = None, mood: str = None):
+    """
+    合成前的公共准备：解析角色与情绪参数、检查参考音频并确保模型已加载
 
-        logger.info(f"查找角色 '{default_character}': {bool(character_config)}")
+    Returns:
+        _resolve_synthesis_kwargs 的结果，任一步骤失败时返回 None
+    """
+    if not GSVI_AVAILABLE:
+        logger.warning("GSVI模块不可用，跳过语音合成。")
+        return None
 
-        if not character_config:
-            logger.error(f"未找到角色配置: {default_character}")
-            logger.error(f"可用角色: {list(characters_config.keys()) if characters_config else 'None'}")
-            return
+    # 加载配置（角色与情绪参数按组合缓存）
+    tts_config = load_tts_config()
+    resolved = _resolve_synthesis_kwargs(character, mood)
+    if resolved is None:
+        return None
 
-        # 获取情绪配置
-        default_mood = mood or character_config.get("default_mood", inference_config["default_mood"])
-        moods_config = character_config.get("moods", {})
-        mood_config = moods_config.get(default_mood)
+    ref_audio_path = resolved[2]["ref_wav_path"]
+    # 存在性检查按时间桶缓存，同一会话的后续文本块不再逐次 stat
+    if not _ref_audio_exists(ref_audio_path, int(time.monotonic() // _REF_STAT_TTL)):
+        logger.error(f"参考音频文件不存在: {ref_audio_path}")
+        logger.error(f"当前工作目录: {os.getcwd()}")
+        return None
 
-        if not mood_config:
-            # 如果找不到指定情绪，尝试使用normal
-            mood_config = moods_config.get("normal")
-            if not mood_config and moods_config:
-                # 如果连normal都没有，使用第一个可用情绪
-                mood_config = list(moods_config.values())[0]
-            if not mood_config:
-                logger.error(f"角色 {default_character} 未找到情绪配置")
-                return
-
-        # 获取参考音频路径和文本
-        ref_audio_path = mood_config.get("audio_path")
-        if ref_audio_path and not os.path.isabs(ref_audio_path):
-            # 如果是相对路径，相对于项目根目录
-            if ref_audio_path.startswith("backend/"):
-                # 如果以backend/开头，从项目根目录开始
-                project_root = Path(__file__).parent.parent.parent.parent.parent
-                ref_audio_path = project_root / ref_audio_path
-            else:
-                # 否则相对于backend目录
-                backend_dir = Path(__file__).parent.parent.parent.parent
-                ref_audio_path = backend_dir / ref_audio_path
-            logger.info(f"backend_dir: {backend_dir if 'backend_dir' in locals() else 'N/A'}")
-            logger.info(f"project_root: {project_root if 'project_root' in locals() else 'N/A'}")
-            logger.info(f"ref_audio_path before: {mood_config.get('audio_path')}")
-            logger.info(f"ref_audio_path after: {ref_audio_path}")
-        
-        ref_audio_path = str(ref_audio_path)
-        prompt_text = mood_config.get("prompt_text", "")
-        prompt_language_en = mood_config.get("language", "chinese")
-        prompt_language = map_language_param(prompt_language_en)
-
-        logger.info(f"检查音频文件: {ref_audio_path}")
-        if not ref_audio_path or not os.path.exists(ref_audio_path):
-            logger.error(f"参考音频文件不存在: {ref_audio_path}")
-            logger.error(f"当前工作目录: {os.getcwd()}")
-            return
-
-        # 其他参数从配置文件读取并映射
-        text_language_en = inference_config.get("default_language", "chinese")
-        text_language = map_language_param(text_language_en)
-
-        how_to_cut_en = inference_config.get("default_how_to_cut", "no_cut")
-        how_to_cut = map_cut_method_param(how_to_cut_en)
-
-        # 从配置文件读取固定参数
-        top_k = inference_config.get("default_top_k", 15)
-        top_p = inference_config.get("default_top_p", 1.0)
-        temperature = inference_config.get("default_temperature", 1.0)
-        ref_free = inference_config.get("default_ref_free", False)
-        speed = inference_config.get("default_speed", 1.0)
-        if_freeze = inference_config.get("default_if_freeze", False)
-        sample_steps = inference_config.get("default_sample_steps", 8)
-        if_sr = inference_config.get("default_if_sr", False)
-        pause_second = inference_config.get("default_pause_second", 0.3)
-
-        logger.info(f"使用角色: {default_character}, 情绪: {default_mood}, 参考音频: {ref_audio_path}")
-
-        # 确保模型已加载
-        if not hasattr(sys.modules.get('core_inference'), 't2s_model') or sys.modules['core_inference'].t2s_model is None:
-            # 加载默认模型
-            default_models = tts_config.get("default_models", {})
-            sovits_path = default_models.get("sovits_path")
-            gpt_path = default_models.get("gpt_path")
-            
-            if not sovits_path or not gpt_path:
-                logger.error("config.json 中必须指定 pretrained_models.sovits_v4 和 pretrained_models.gpt_v4")
-                return
-            
-            if os.path.exists(sovits_path) and os.path.exists(gpt_path):
-                logger.info(f"加载TTS模型: SoVITS={sovits_path}, GPT={gpt_path}")
-                load_models(gpt_path, sovits_path)
-            else:
-                logger.error(f"TTS模型文件不存在: SoVITS={sovits_path}, GPT={gpt_path}")
-                return
-
-        # 调用TTS函数
-        result_generator = get_tts_wav(
-            ref_wav_path=ref_audio_path,
-            prompt_text=prompt_text,
-            prompt_language=prompt_language,
-            text=text_chunk,
-            text_language=text_language,
-            how_to_cut=how_to_cut,
-            top_k=top_k,
-            top_p=top_p,
-            temperature=temperature,
-            ref_free=ref_free,
-            speed=speed,
-            if_freeze=if_freeze,
-            inp_refs=None,
-            sample_steps=sample_steps,
-            if_sr=if_sr,
-            pause_second=pause_second,
-        )
+    # 确保模型已加载（加载与推理都在TTS专用线程中执行，不阻塞事件循环）
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(_TTS_EXECUTOR, _ensure_models_loaded, tts_config):
+        return None
+    return resolved
 
-        # 获取生成的音频
-        sr, audio_data = next(result_generator)
 
-        if sr is None or audio_data is None:
-            logger.error("音频生成失败")
-            return None
+async def text_to_speech_stream(text_chunk: str, character: str = None, mood: str = None):
+    """
+    异步调用TTS服务进行语音合成，并返回音频数据。
 
-        # 将音频数据转换为适合传输的格式
-        import torch
-        import torchaudio
-        import numpy as np
-        import io
+    Args:
+        text_chunk (str): 需要合成的文本块。
+        character (str): 角色名称，如果为None则使用配置中的默认值。
+        mood (str): 情绪，如果为None则使用配置中的默认值。
 
-        # 确保音频数据是正确的格式
-        if isinstance(audio_data, np.ndarray):
-            # 转换为 torch tensor
-            audio_tensor = torch.from_numpy(audio_data.astype(np.float32)) / 32767.0
-        else:
-            audio_tensor = audio_data
+    Returns:
+        tuple: (sample_rate, audio_data) 或 None如果失败
+    """
+    return (await text_to_speech_stream_batch([text_chunk], character, mood))[0]
 
-        # 创建内存缓冲区来保存音频
-        buffer = io.BytesIO()
-        torchaudio.save(buffer, audio_tensor.unsqueeze(0), sr, format="wav")
-        audio_bytes = buffer.getvalue()
 
-        logger.info(f"成功为文本 '{text_chunk}' 生成TTS音频，角色: {default_character}，情绪: {default_mood}，大小: {len(audio_bytes)} 字节")
+async def text_to_speech_stream_batch(
+    text_chunks: List[str],
+    character: str = None,
+    mood: str = None,
+    on_result: Optional[Callable[[int, Optional[Tuple[int, bytes]]], None]] = None,
+) -> list:
+    """
+    批量语音合成（同一角色与情绪），按顺序返回每个文本块的结果。
+
+    GSVI 推理接口不支持批维度，这里对整批只解析一次参数、检查一次模型，
+    再逐块提交到TTS线程依次合成（共享缓存的参考音频特征）。
+
+    Args:
+        text_chunks (List[str]): 需要合成的文本块列表。
+        character (str): 角色名称，如果为None则使用配置中的默认值。
+        mood (str): 情绪，如果为None则使用配置中的默认值。
+        on_result (Callable): 每个文本块合成完成后立即以 (序号, 结果) 调用，无需等待整批结束。
 
-        return sr, audio_bytes
+    Returns:
+        list: 与输入一一对应的 (sample_rate, audio_data) 或 None
+    """
+    failed = [None] * len(text_chunks)
+    try:
+        resolved = await _prepare_synthesis(character, mood)
+        if resolved is None:
+            return failed
+        default_character, default_mood, synthesis_kwargs = resolved
+
+        loop = asyncio.get_running_loop()
+        results = []
+        for index, text_chunk in enumerate(text_chunks):
+            # 调用TTS函数
+            result = await loop.run_in_executor(_TTS_EXECUTOR, _run_tts_chunk_sync, text_chunk, synthesis_kwargs)
+            if result is None:
+                logger.error(f"音频生成失败: '{text_chunk}'")
+            else:
+                logger.info(f"成功为文本 '{text_chunk}' 生成TTS音频，角色: {default_character}，情绪: {default_mood}，大小: {len(result[1])} 字节")
+            results.append(result)
+            if on_result is not None:
+                on_result(index, result)
+        return results
 
     except Exception as e:
-        logger.error(f"处理TTS请求时发生未知错误: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return None
+        logger.exception("处理TTS请求时发生未知错误: {}", e)
+        return failed
+
+
+class TTSBatcher:
+    """
+    跨请求的TTS动态批处理器。
+    - 合并已在队列中等待的文本块，同组只解析一次参数与检查一次模型。
+    - 每个文本块合成完成即返回给对应请求，不必等待整批结束。
+    - 推理在TTS专用线程中执行，期间到达的请求自动进入下一批。
+    """
+
+    def __init__(self, max_batch_size: int = 8):
+        self.max_batch_size = max_batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(self, text_chunk: str, character: str = None, mood: str = None):
+        """提交文本块并等待其合成结果"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text_chunk, character, mood, future))
+        return await future
+
+    async def _collect(self) -> list:
+        """取出一批待合成的请求：阻塞等待第一个，随后只合并已在排队的请求，不额外等待"""
+        batch = [await self._queue.get()]
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # 丢弃已被取消的请求（如客户端断开），并按角色与情绪分组，同组共享参数解析与参考音频
+            groups = {}
+            for text, character, mood, future in batch:
+                if not future.done():
+                    groups.setdefault((character, mood), []).append((text, future))
+            if len(batch) > 1:
+                logger.debug("TTS批处理: 合并 {} 个文本块，共 {} 组", len(batch), len(groups))
+            for (character, mood), items in groups.items():
+                futures = [future for _, future in items]
+
+                def resolve(index, result, futures=futures):
+                    # 每个文本块合成完成即返回给对应请求，组内靠前的句子不必等待整组结束
+                    if not futures[index].done():
+                        futures[index].set_result(result)
+
+                try:
+                    await text_to_speech_stream_batch(
+                        [text for text, _ in items], character, mood, on_result=resolve
+                    )
+                except Exception as e:
+                    logger.error(f"TTS批处理失败: {e}")
+                # 准备失败或中途异常时，尚未完成的请求统一返回 None
+                for future in futures:
+                    if not future.done():
+                        future.set_result(None)
+
+
+# 全局TTS批处理器实例
+tts_batcher = TTSBatcher(
+    max_batch_size=app_config.get("tts_config", {}).get("max_batch_size", 8),
+)
 
 
 # 示例用法
@@ -9,6 +9,7 @@ from typing import List, Dict, Any
 
 import uuid
 from enum import Enum
+from functools import cached_property
 from tortoise.models import Model
 from tortoise import fields
 
@@ -27,7 +28,8 @@ class ChatMessage(Model):
     content = fields.TextField(description="消息内容")
     components = fields.JSONField(default=list, description="消息组件JSON")
     model = fields.CharField(max_length=100, null=True, description="模型名称")
-    timestamp = fields.BigIntField(description="消息时间戳")
+    # 历史记录按时间戳排序并截取最近 N 条，建立索引避免全表排序
+    timestamp = fields.BigIntField(index=True, description="消息时间戳")
 
     class Meta:
         table = "chat_message"
@@ -35,45 +37,76 @@ class ChatMessage(Model):
         # 按时间戳排序，最新的消息在前面
         ordering = ["-timestamp"]
 
-    @property
+    @cached_property
     def message_components(self) -> List[Dict[str, Any]]:
-        """获取消息组件列表"""
+        """获取消息组件列表（同一实例只构建一次）"""
         if not self.components:
             # 如果没有组件，尝试将content作为文本组件
             return [{"type": "text", "content": self.content, "extra": None}]
         return self.components
 
+    @cached_property
+    def component_types(self) -> List[str]:
+        """组件类型列表（与 message_components 一一对应，同一实例只构建一次）"""
+        return [comp["type"] for comp in self.message_components]
+
     def get_display_content(self) -> str:
         """获取可显示的消息内容"""
         if not self.components:
             return self.content
 
-        text_parts = []
-        for comp in self.components:
-            if comp["type"] == "text":
-                text_parts.append(comp["content"])
-            else:
-                text_parts.append(f"[{comp['type']}: {comp['content']}]")
-
-        return " ".join(text_parts)
+        return " ".join(
+            comp["content"] if comp["type"] == "text" else f"[{comp['type']}: {comp['content']}]"
+            for comp in self.components
+        )
 
     def has_component_type(self, component_type: str) -> bool:
         """检查消息是否包含特定类型的组件"""
-        return any(comp["type"] == component_type for comp in self.message_components)
+        return component_type in self.component_types
 
     def get_components_by_type(self, component_type: str) -> List[Dict[str, Any]]:
         """获取特定类型的所有组件"""
-        return [comp for comp in self.message_components if comp["type"] == component_type]
+        return [
+            comp
+            for comp, type_ in zip(self.message_components, self.component_types)
+            if type_ == component_type
+        ]
 
     @classmethod
-    async def from_llm_message(cls, llm_message):
-        """从LLMMessage创建ChatMessage"""
-        return await cls.create(
-            message_id=uuid.UUID(llm_message.message_id),
-            role=llm_message.sender.role,
+    def _build_from_llm_message(cls, llm_message) -> "ChatMessage":
+        """从LLMMessage构建（未保存的）ChatMessage实例"""
+        role = llm_message.sender.role
+        if isinstance(role, str) and role.startswith("MessageRole."):
+            role = role.split(".")[-1].lower()
+        elif hasattr(role, "value"):
+            role = role.value
+
+        if llm_message.components:
+            components = [
+                comp.model_dump() if hasattr(comp, "model_dump") else comp for comp in llm_message.components
+            ]
+        else:
+            components = [{"type": "text", "content": llm_message.message_str, "extra": None}]
+
+        return cls(
+            message_id=uuid.UUID(llm_message.message_id) if llm_message.message_id else uuid.uuid4(),
+            role=str(role),
             content=llm_message.message_str,
-            components=[
-                {"type": comp.type, "content": comp.content, "extra": comp.extra} for comp in llm_message.components
-            ],
+            components=components,
+            model=getattr(llm_message.sender, "nickname", None),
             timestamp=llm_message.timestamp,
         )
+
+    @classmethod
+    async def from_llm_message(cls, llm_message):
+        """从LLMMessage创建ChatMessage"""
+        message = cls._build_from_llm_message(llm_message)
+        await message.save(force_create=True)
+        return message
+
+    @classmethod
+    async def from_llm_messages(cls, llm_messages) -> List["ChatMessage"]:
+        """从多条LLMMessage批量创建ChatMessage（单条 INSERT）"""
+        messages = [cls._build_from_llm_message(llm_message) for llm_message in llm_messages]
+        await cls.bulk_create(messages, batch_size=500)
+        return messages
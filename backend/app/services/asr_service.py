@@ -7,39 +7,117 @@ import numpy as np
 import base64
 import os
 import tempfile
+import threading
 import io
 import json
-import os
-from pathlib import Path
+import re
+import struct
+from math import gcd
 from typing import Dict, Any, List, Tuple, Optional, Union
 
-# 项目根目录
-ROOT_DIR = Path(__file__).parent.parent.parent
+from ..config.app_config import get_stt_settings, get_vad_settings
+from ..config.constant import ROOT_DIR
 
+# int16 PCM 归一化到 [-1, 1) 的比例
+_INT16_SCALE = np.float32(1.0 / 32768.0)
 
-def get_stt_settings() -> Dict[str, Any]:
-    """获取STT配置"""
-    # 使用后端统一配置系统
-    try:
-        from .. import app_config
-        return app_config.get("stt", {})
-    except Exception as e:
-        logger.warning(f"无法加载后端配置，使用空配置: {e}")
-        return {}
+# SenseVoice 输出中的特殊标记，如 <|zh|><|NEUTRAL|><|Speech|><|woitn|>
+_SENSEVOICE_TAG_RE = re.compile(r'<\|[^|]*\|>')
 
 
-def get_vad_settings() -> Dict[str, Any]:
-    """获取VAD配置"""
+# 配置日志
+logger = logging.getLogger("asr_service")
+
+# ASR 模型的输入采样率
+_ASR_SAMPLE_RATE = 16000
+
+# WAV (RIFF) 块头与 fmt 块的固定字段
+_RIFF_HEADER = struct.Struct("<4sI4s")
+_CHUNK_HEADER = struct.Struct("<4sI")
+_FMT_FIELDS = struct.Struct("<HHIIHH")
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# 流式写入的 WAV 在录制结束前 data 块长度尚未回填，常见占位值
+_STREAMING_DATA_SIZES = (0, 0xFFFFFFFF)
+
+
+def _parse_wav(audio_data: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """
+    在内存中解析 WAV 数据，返回单声道 float32 采样与采样率
+
+    仅支持 16-bit PCM 与 32-bit float，其他编码或格式错误时返回 None
+    """
+    if len(audio_data) < _RIFF_HEADER.size:
+        return None
+    riff, _, wave = _RIFF_HEADER.unpack_from(audio_data)
+    if riff != b"RIFF" or wave != b"WAVE":
+        return None
+
+    fmt = None
+    offset = _RIFF_HEADER.size
+    while offset + _CHUNK_HEADER.size <= len(audio_data):
+        chunk_id, size = _CHUNK_HEADER.unpack_from(audio_data, offset)
+        offset += _CHUNK_HEADER.size
+        if chunk_id == b"fmt " and size >= _FMT_FIELDS.size:
+            fmt = list(_FMT_FIELDS.unpack_from(audio_data, offset))
+            if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and size >= 40:
+                # 扩展格式的真实编码位于子格式 GUID 的前两个字节（fmt 块偏移 24 处）
+                fmt[0] = struct.unpack_from("<H", audio_data, offset + 24)[0]
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            format_tag, channels, sample_rate, _, _, bits = fmt
+            # 流式录制的 WAV 可能未回填 data 块长度（占位值），此时取其后的全部数据；长度超出实际数据时按实际截断
+            if size in _STREAMING_DATA_SIZES:
+                payload = memoryview(audio_data)[offset:]
+            else:
+                payload = memoryview(audio_data)[offset:offset + size]
+            if format_tag == _WAVE_FORMAT_PCM and bits == 16:
+                samples = np.frombuffer(payload[:len(payload) - len(payload) % 2], dtype=np.int16)
+                samples = np.multiply(samples, _INT16_SCALE, dtype=np.float32)
+            elif format_tag == _WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+                samples = np.frombuffer(payload[:len(payload) - len(payload) % 4], dtype=np.float32)
+            else:
+                return None
+            if channels > 1:
+                samples = samples[:len(samples) - len(samples) % channels]
+                samples = samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+            if not len(samples) or not sample_rate:
+                # 没有可用的采样数据，交由通用解码器处理
+                return None
+            return samples, sample_rate
+        # RIFF 块按偶数字节对齐
+        offset += size + (size & 1)
+    return None
+
+
+def _decode_audio(audio_data: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """使用 libsndfile 在内存中解码其他音频格式，返回单声道 float32 采样与采样率，无法解码时返回 None"""
     try:
-        from .. import app_config
-        return app_config.get("vad", {})
+        import soundfile as sf
+        samples, sample_rate = sf.read(io.BytesIO(audio_data), dtype="float32", always_2d=True)
     except Exception as e:
-        logger.warning(f"无法加载VAD配置: {e}")
-        return {}
+        logger.debug(f"内存解码音频失败: {str(e)}")
+        return None
+    if not len(samples):
+        return None
+    return samples.mean(axis=1, dtype=np.float32), sample_rate
 
 
-# 配置日志
-logger = logging.getLogger("asr_service")
+def _resample_to_asr_rate(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    将采样重采样到 ASR 模型的 16kHz 输入采样率
+
+    必须在调用模型前完成：FunASR 启用 VAD 时会先把整段音频重采样到 16kHz 再切分，
+    而传给 ASR 模型的 fs 仍是原始采样率，导致各片段被再次重采样；且 fs 会写入模型的持久参数
+    """
+    if sample_rate == _ASR_SAMPLE_RATE:
+        return samples
+    from scipy.signal import resample_poly
+
+    factor = gcd(_ASR_SAMPLE_RATE, sample_rate)
+    return resample_poly(samples, _ASR_SAMPLE_RATE // factor, sample_rate // factor).astype(np.float32, copy=False)
 
 
 class ASRService:
@@ -50,6 +128,17 @@ class ASRService:
         self.settings = get_stt_settings()
         self.vad_settings = get_vad_settings()
         self.model = None
+        # SenseVoice rich后处理函数（随模型一同解析，不可用时为 None，使用正则清理）
+        self._rich_postprocess = None
+
+        # 识别参数在初始化时解析一次，每次识别直接复用
+        self._generate_kwargs = {
+            "language": "zh",  # 强制指定中文
+            "use_itn": False,  # 不使用逆文本规范化，保持原始输出
+            "batch_size_s": 60,  # 动态批处理
+            "merge_vad": self.vad_settings.get("merge_vad", True),  # 合并VAD分割的短音频片段
+            "merge_length_s": self.vad_settings.get("merge_length_s", 15),  # 合并长度
+        }
         
         # 初始化ASR模型
         self._init_asr_model()
@@ -63,13 +152,10 @@ class ASRService:
 
             # 确保路径指向backend目录下的SenseVoiceSmall
             if model_dir.startswith("./"):
-                # 获取backend目录路径
-                backend_dir = Path(__file__).parent.parent.parent
-                model_dir = backend_dir / model_dir[2:]  # 移除./前缀
+                model_dir = ROOT_DIR / model_dir[2:]  # 移除./前缀
             elif not os.path.isabs(model_dir):
                 # 相对路径，相对于backend目录
-                backend_dir = Path(__file__).parent.parent.parent
-                model_dir = backend_dir / model_dir
+                model_dir = ROOT_DIR / model_dir
 
             model_dir = str(model_dir)
             use_gpu = self.settings.get("use_gpu", True)
@@ -101,6 +187,12 @@ class ASRService:
             )
             logger.info("ASR模型加载完成")
 
+            try:
+                from funasr.utils.postprocess_utils import rich_transcription_postprocess
+                self._rich_postprocess = rich_transcription_postprocess
+            except ImportError:
+                self._rich_postprocess = None
+
         except Exception as e:
             logger.error(f"初始化ASR模型失败: {str(e)}", exc_info=True)
             self.model = None  # 确保模型为None，这样recognize方法会报错
@@ -122,25 +214,19 @@ class ASRService:
         Returns:
             清理后的纯文本
         """
-        try:
-            # 尝试使用SenseVoice的rich transcription后处理
-            from funasr.utils.postprocess_utils import rich_transcription_postprocess
-            cleaned_text = rich_transcription_postprocess(raw_text)
-            logger.debug(f"SenseVoice rich后处理: '{raw_text}' -> '{cleaned_text}'")
-            return cleaned_text
-        except ImportError:
+        if self._rich_postprocess is None:
             # 如果没有rich_transcription_postprocess，使用正则表达式清理
-            import re
-            cleaned_text = re.sub(r'<\|[^|]*\|>', '', raw_text)
-            cleaned_text = cleaned_text.strip()
+            cleaned_text = _SENSEVOICE_TAG_RE.sub('', raw_text).strip()
             logger.debug(f"SenseVoice正则清理: '{raw_text}' -> '{cleaned_text}'")
             return cleaned_text
+        try:
+            # 使用SenseVoice的rich transcription后处理
+            cleaned_text = self._rich_postprocess(raw_text)
+            logger.debug(f"SenseVoice rich后处理: '{raw_text}' -> '{cleaned_text}'")
+            return cleaned_text
         except Exception as e:
             logger.warning(f"SenseVoice后处理失败，使用正则清理: {str(e)}")
-            import re
-            cleaned_text = re.sub(r'<\|[^|]*\|>', '', raw_text)
-            cleaned_text = cleaned_text.strip()
-            return cleaned_text
+            return _SENSEVOICE_TAG_RE.sub('', raw_text).strip()
     
     def recognize(self, audio_data: bytes, audio_format: str = "auto") -> Dict[str, Any]:
         """识别音频
@@ -156,43 +242,46 @@ class ASRService:
             return {"success": False, "error": "ASR模型未初始化"}
 
         try:
-            # FunASR支持直接接收numpy数组，避免格式转换
-            if audio_format.lower() in ["auto", "pcm"]:
+            # FunASR支持直接接收numpy数组，音频尽量在内存中解码，避免临时文件读写
+            audio_format = audio_format.lower()
+            decoded = None
+            if audio_format == "wav" or (audio_format == "auto" and audio_data[:4] == b"RIFF"):
+                decoded = _parse_wav(audio_data)
+                if decoded is None:
+                    decoded = _decode_audio(audio_data)
+            elif audio_format not in ("auto", "pcm"):
+                decoded = _decode_audio(audio_data)
+            else:
                 # 假设音频数据是16-bit PCM格式，转换为float32并归一化到[-1, 1]
-                audio_np = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
-                logger.info(f"直接使用numpy数组识别，样本数: {len(audio_np)}")
-                
-                # 执行识别，使用numpy数组作为输入
+                # 类型转换与缩放在一次遍历中完成，不产生中间数组
+                audio_np = np.multiply(np.frombuffer(audio_data, dtype=np.int16), _INT16_SCALE, dtype=np.float32)
+                decoded = audio_np, _ASR_SAMPLE_RATE
+
+            if decoded is not None:
+                audio_np, sample_rate = decoded
+                logger.info(f"直接使用numpy数组识别，样本数: {len(audio_np)}，采样率: {sample_rate}")
+                audio_np = _resample_to_asr_rate(audio_np, sample_rate)
+
+                # 执行识别，使用numpy数组作为输入（已统一为16kHz）
                 result = self.model.generate(
                     input=audio_np,
-                    fs=16000,  # 采样率16kHz
-                    language="zh",  # 强制指定中文
-                    use_itn=False,   # 不使用逆文本规范化，保持原始输出
-                    batch_size_s=60,  # 动态批处理
-                    merge_vad=self.vad_settings.get("merge_vad", True),   # 合并VAD分割的短音频片段
-                    merge_length_s=self.vad_settings.get("merge_length_s", 15)  # 合并长度
+                    fs=_ASR_SAMPLE_RATE,
+                    **self._generate_kwargs,
                 )
             else:
-                # 对于其他格式，如果需要文件方式，使用临时文件
-                temp_path = tempfile.mktemp(suffix=f".{audio_format}")
-                with open(temp_path, 'wb') as f:
-                    f.write(audio_data)
-                
+                # 内存中无法解码的格式，交由FunASR从文件读取
                 logger.info(f"使用临时文件识别，格式: {audio_format}")
-                
-                # 执行识别
-                result = self.model.generate(
-                    input=temp_path,
-                    language="zh",  # 强制指定中文
-                    use_itn=False,   # 不使用逆文本规范化，保持原始输出
-                    batch_size_s=60,  # 动态批处理
-                    merge_vad=self.vad_settings.get("merge_vad", True),   # 合并VAD分割的短音频片段
-                    merge_length_s=self.vad_settings.get("merge_length_s", 15)  # 合并长度
-                )
-                
-                # 删除临时文件
-                os.unlink(temp_path)
-            
+                with tempfile.NamedTemporaryFile(suffix=f".{audio_format}", delete=False) as f:
+                    f.write(audio_data)
+                    temp_path = f.name
+                try:
+                    result = self.model.generate(
+                        input=temp_path,
+                        **self._generate_kwargs,
+                    )
+                finally:
+                    os.unlink(temp_path)
+
             # 提取识别文本 - SenseVoice结果格式
             if isinstance(result, list) and len(result) > 0:
                 raw_text = result[0].get("text", "")
@@ -234,6 +323,7 @@ class ASRService:
 
 # 全局单例
 _asr_service = None
+_asr_service_lock = threading.Lock()
 
 
 def get_asr_service() -> ASRService:
@@ -244,5 +334,7 @@ def get_asr_service() -> ASRService:
     """
     global _asr_service
     if _asr_service is None:
-        _asr_service = ASRService()
+        with _asr_service_lock:
+            if _asr_service is None:
+                _asr_service = ASRService()
     return _asr_service
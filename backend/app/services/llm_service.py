@@ -7,25 +7,16 @@
 import logging
 import asyncio
 import aiohttp
-import json
+import orjson
 import os
 import re
-from pathlib import Path
 from typing import Optional, Dict, Any
 
-# 项目根目录
-ROOT_DIR = Path(__file__).parent.parent.parent
+from ..config.app_config import get_stt_settings
 
-
-def get_stt_settings() -> Dict[str, Any]:
-    """获取STT配置"""
-    # 使用后端统一配置系统
-    try:
-        from app.config.default import DEFAULT_CONFIG
-        return DEFAULT_CONFIG.get("stt", {})
-    except Exception as e:
-        logger.warning(f"无法加载后端配置，使用空配置: {e}")
-        return {}
+# 预编译清理ASR文本使用的正则
+_SENSEVOICE_TAG_RE = re.compile(r'<\|[^|]*\|>')
+_WHITESPACE_RE = re.compile(r'\s+')
 
 
 logger = logging.getLogger(__name__)
@@ -38,6 +29,20 @@ class LLMService:
         self.llm_config = self.settings.get("llm", {})
         self.api_url = self.llm_config.get("api_url", "")
         self.enabled = self.llm_config.get("enabled", False)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取持久化的HTTP会话，跨请求复用连接（惰性创建）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=64, limit_per_host=32, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        """关闭持久化的HTTP会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
         
     def clean_asr_text(self, text: str) -> str:
         """
@@ -54,10 +59,10 @@ class LLMService:
             
         # 移除SenseVoice的特殊标记
         # 匹配模式如: <|zh|><|NEUTRAL|><|Speech|><|woitn|>
-        cleaned_text = re.sub(r'<\|[^|]*\|>', '', text)
+        cleaned_text = _SENSEVOICE_TAG_RE.sub('', text)
         
         # 移除多余的空格和换行
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
+        cleaned_text = _WHITESPACE_RE.sub(' ', cleaned_text).strip()
         
         logger.info(f"文本清理: '{text}' -> '{cleaned_text}'")
         return cleaned_text
@@ -122,35 +127,36 @@ class LLMService:
             
             logger.info(f"使用超时配置 - 总超时: {total_timeout}s, 连接超时: {connect_timeout}s, 读取超时: {read_timeout}s")
             
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    url,
-                    data=form_data,
-                    headers={
-                        "Content-Type": "application/x-www-form-urlencoded"
-                    }
-                ) as response:
-                    if response.status == 200:
-                        # 检查响应类型
-                        content_type = response.headers.get('content-type', '')
-                        
-                        if 'text/event-stream' in content_type:
-                            # 处理流式响应
-                            logger.info("处理流式响应")
-                            return await self._handle_stream_response(response)
-                        else:
-                            # 处理JSON响应
-                            logger.info("处理JSON响应")
-                            result = await response.json()
-                            logger.info(f"LLM响应成功: {result}")
-                            return result
+            # 复用持久会话（连接池），超时按请求设置
+            async with self._get_session().post(
+                url,
+                data=form_data,
+                headers={
+                    "Content-Type": "application/x-www-form-urlencoded"
+                },
+                timeout=timeout,
+            ) as response:
+                if response.status == 200:
+                    # 检查响应类型
+                    content_type = response.headers.get('content-type', '')
+                    
+                    if 'text/event-stream' in content_type:
+                        # 处理流式响应
+                        logger.info("处理流式响应")
+                        return await self._handle_stream_response(response)
                     else:
-                        error_text = await response.text()
-                        logger.error(f"LLM API错误 {response.status}: {error_text}")
-                        return {
-                            "error": f"API错误 {response.status}",
-                            "details": error_text
-                        }
+                        # 处理JSON响应
+                        logger.info("处理JSON响应")
+                        result = await response.json(loads=orjson.loads)
+                        logger.info(f"LLM响应成功: {result}")
+                        return result
+                else:
+                    error_text = await response.text()
+                    logger.error(f"LLM API错误 {response.status}: {error_text}")
+                    return {
+                        "error": f"API错误 {response.status}",
+                        "details": error_text
+                    }
                         
         except asyncio.TimeoutError:
             logger.error("LLM API请求超时")
@@ -189,13 +195,13 @@ class LLMService:
                         break
                     
                     try:
-                        data = json.loads(data_str)
+                        data = orjson.loads(data_str)
                         
                         if 'text' in data:
                             # 累积文本
                             full_text += data['text']
                             
-                    except json.JSONDecodeError:
+                    except orjson.JSONDecodeError:
                         # 跳过无效的JSON行
                         continue
             
@@ -224,3 +230,8 @@ def get_llm_service() -> LLMService:
     if _llm_service is None:
         _llm_service = LLMService()
     return _llm_service
+
+async def close_llm_service():
+    """关闭LLM服务实例持有的持久HTTP连接"""
+    if _llm_service is not None:
+        await _llm_service.close()
@@ -7,23 +7,10 @@ import sqlite3
 import logging
 import numpy as np
 import base64
-import os
-from pathlib import Path
+import threading
 from typing import Dict, Any, Optional, Callable
 
-# 项目根目录
-ROOT_DIR = Path(__file__).parent.parent.parent
-
-
-def get_stt_settings() -> Dict[str, Any]:
-    """获取STT配置"""
-    # 使用后端统一配置系统
-    try:
-        from app.config.default import DEFAULT_CONFIG
-        return DEFAULT_CONFIG.get("stt", {})
-    except Exception as e:
-        logger.warning(f"无法加载后端配置，使用空配置: {e}")
-        return {}
+from ..config.app_config import get_stt_settings
 
 
 # 配置日志
@@ -483,6 +470,7 @@ class VPRService:
 
 # 全局单例
 _vpr_service = None
+_vpr_service_lock = threading.Lock()
 
 
 def get_vpr_service() -> VPRService:
@@ -493,5 +481,7 @@ def get_vpr_service() -> VPRService:
     """
     global _vpr_service
     if _vpr_service is None:
-        _vpr_service = VPRService()
+        with _vpr_service_lock:
+            if _vpr_service is None:
+                _vpr_service = VPRService()
     return _vpr_service
@@ -1,8 +1,11 @@
 import uvicorn
 import argparse
+import asyncio
+import importlib
 import sys
 import os
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from tortoise.contrib.fastapi import register_tortoise
 from loguru import logger
@@ -17,6 +20,9 @@ from app.api.llm import api_llm
 from app.config.app_config import AppConfig
 from fastapi.staticfiles import StaticFiles
 
+# uvicorn 服务器实现：非 Windows 平台使用 uvloop 事件循环与 httptools HTTP 解析器
+UVICORN_SERVER_OPTIONS = {"loop": "uvloop", "http": "httptools"} if sys.platform != "win32" else {}
+
 # 解析命令行参数
 parser = argparse.ArgumentParser(description="VOXELINK Backend Server")
 parser.add_argument("--enable-stt", action="store_true", help="Enable STT (Speech-to-Text) service")
@@ -27,7 +33,12 @@ parser.add_argument("--port", type=int, default=8080, help="Port to bind to")
 def create_app(enable_stt: bool = False, enable_tts: bool = False):
     """创建FastAPI应用"""
     
-    app = FastAPI(title="VOXELINK Backend", description="Voxelink Backend with integrated STT/TTS", version="0.1.0")
+    app = FastAPI(
+        title="VOXELINK Backend",
+        description="Voxelink Backend with integrated STT/TTS",
+        version="0.1.0",
+        default_response_class=ORJSONResponse,
+    )
 
     # 注册 SQLite + Tortoise ORM 服务
     import os
@@ -55,11 +66,21 @@ def create_app(enable_stt: bool = False, enable_tts: bool = False):
             "version": "0.1.0"
         }
 
-    # 注册 CORS 中间件
+    @app.on_event("shutdown")
+    async def close_llm_sessions():
+        """关闭LLM客户端的持久HTTP连接"""
+        from app.core.pipeline.text_process import close_text_process
+        await close_text_process()
+        # LLM转发服务仅在STT路径中被导入，未加载时无需（也不应）为关闭连接而导入
+        llm_service_module = sys.modules.get("app.services.llm_service")
+        if llm_service_module is not None:
+            await llm_service_module.close_llm_service()
+
+    # 注册 CORS 中间件（不携带凭据，通配符来源可直接返回 *，无需逐请求回显 Origin）
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
-        allow_credentials=True,
+        allow_credentials=False,
         allow_methods=["*"],
         allow_headers=["*"],
     )
@@ -79,11 +100,23 @@ def create_app(enable_stt: bool = False, enable_tts: bool = False):
     # 条件注册STT路由
     if enable_stt:
         try:
-            # 导入STT API路由
-            from backend import asr, vpr, ws
-            app.include_router(asr, prefix="/stt")
-            app.include_router(vpr, prefix="/stt")
-            app.include_router(ws, prefix="/stt")
+            # 导入STT API路由（经由 app 包导入，避免通过 backend 包再加载一份模块副本）
+            # 仅在启用STT时才导入，torch 等依赖不会进入默认启动路径
+            for name in ("asr", "vpr", "ws"):
+                module = importlib.import_module(f"app.api.{name}")
+                app.include_router(module.router, prefix="/stt")
+
+            @app.on_event("startup")
+            async def prewarm_stt_services():
+                """并行预加载ASR与VPR模型，启动耗时取两者较大值而非之和"""
+                from app.services.asr_service import get_asr_service
+                from app.services.vpr_service import get_vpr_service
+                await asyncio.gather(
+                    asyncio.to_thread(get_asr_service),
+                    asyncio.to_thread(get_vpr_service),
+                )
+                logger.info("STT模型预加载完成")
+
             logger.info("STT服务已启用")
         except Exception as e:
             logger.warning(f"无法加载STT模块: {e}")
@@ -119,9 +152,8 @@ def create_app(enable_stt: bool = False, enable_tts: bool = False):
                     """加载GSVI配置文件"""
                     # 直接使用后端统一的配置系统
                     from app.config.default import DEFAULT_CONFIG
-                    tts_config = DEFAULT_CONFIG["tts"]["gpt_sovits"]
-                    # 添加characters配置
-                    tts_config["characters"] = DEFAULT_CONFIG["characters"]
+                    # 复制一份再添加characters配置，避免修改全局默认配置
+                    tts_config = {**DEFAULT_CONFIG["tts"]["gpt_sovits"], "characters": DEFAULT_CONFIG["characters"]}
                     logger.info("加载TTS配置")
                     return tts_config
                 
@@ -132,7 +164,7 @@ def create_app(enable_stt: bool = False, enable_tts: bool = False):
                 
                 # 设置TTS服务的配置
                 try:
-                    from backend import set_tts_config
+                    from app.core.tts.tts_service import set_tts_config
                     set_tts_config(tts_config)
                 except ImportError as e:
                     logger.warning(f"无法设置TTS服务配置: {e}")
@@ -177,4 +209,4 @@ if __name__ == "__main__":
     if args.enable_tts:
         logger.info("TTS服务已启用")
 
-    uvicorn.run(app, host=args.host, port=args.port)
+    uvicorn.run(app, host=args.host, port=args.port, **UVICORN_SERVER_OPTIONS)
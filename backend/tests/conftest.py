@@ -0,0 +1,11 @@
+"""
+tests/conftest.py
+测试公共配置：将 backend 目录加入 sys.path，使 app 包可直接导入。
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
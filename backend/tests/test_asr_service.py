@@ -0,0 +1,95 @@
+"""
+tests/test_asr_service.py
+ASRService 内存解码与重采样测试（使用假模型，不加载 FunASR）。
+"""
+
+import io
+import struct
+import wave
+
+import numpy as np
+
+from app.services.asr_service import ASRService, _parse_wav
+
+
+def _make_wav(sample_rate: int, seconds: float = 1.0, channels: int = 1) -> bytes:
+    """生成 16-bit PCM 正弦波 WAV"""
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    samples = (np.sin(2 * np.pi * 440 * t) * 16000).astype(np.int16)
+    if channels > 1:
+        samples = np.repeat(samples, channels)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def _set_data_size(wav_bytes: bytes, size: int) -> bytes:
+    """改写 data 块长度字段（模拟流式写入时未回填的占位值）"""
+    offset = wav_bytes.index(b"data") + 4
+    return wav_bytes[:offset] + struct.pack("<I", size) + wav_bytes[offset + 4:]
+
+
+class _FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, **kwargs):
+        self.calls.append(kwargs)
+        return [{"text": "测试"}]
+
+
+def _make_service() -> ASRService:
+    service = ASRService.__new__(ASRService)
+    service.model = _FakeModel()
+    service._rich_postprocess = None
+    service._generate_kwargs = {}
+    return service
+
+
+def test_parse_wav_keeps_source_rate():
+    samples, sample_rate = _parse_wav(_make_wav(48000))
+    assert sample_rate == 48000
+    assert len(samples) == 48000
+    assert samples.dtype == np.float32
+
+
+def test_parse_wav_downmixes_channels():
+    samples, sample_rate = _parse_wav(_make_wav(44100, channels=2))
+    assert sample_rate == 44100
+    assert len(samples) == 44100
+
+
+def test_parse_wav_streaming_placeholder_size():
+    wav_bytes = _make_wav(16000, seconds=0.5)
+    for placeholder in (0, 0xFFFFFFFF):
+        samples, _ = _parse_wav(_set_data_size(wav_bytes, placeholder))
+        assert len(samples) == 8000
+
+
+def test_parse_wav_without_samples_returns_none():
+    assert _parse_wav(_make_wav(16000, seconds=0)) is None
+
+
+def test_recognize_resamples_non_16k_wav():
+    service = _make_service()
+    for sample_rate in (44100, 48000):
+        result = service.recognize(_make_wav(sample_rate), audio_format="wav")
+        assert result == {"success": True, "text": "测试"}
+
+        kwargs = service.model.calls[-1]
+        assert kwargs["fs"] == 16000
+        assert len(kwargs["input"]) == 16000
+        assert kwargs["input"].dtype == np.float32
+
+
+def test_recognize_auto_detects_wav():
+    service = _make_service()
+    service.recognize(_make_wav(16000), audio_format="auto")
+    kwargs = service.model.calls[-1]
+    # WAV 头不应被当作 PCM 采样
+    assert len(kwargs["input"]) == 16000
+    assert kwargs["fs"] == 16000
@@ -3,8 +3,10 @@
 VOXELINK GUI 配置文件管理页面模块
 """
 
-import json
+import os
 from pathlib import Path
+
+import orjson
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QCheckBox, QLineEdit, QPushButton, QGroupBox, QScrollArea, QSpinBox, QDoubleSpinBox
 from PyQt6.QtGui import QFont
 
@@ -54,11 +56,19 @@ class ConfigPage(QWidget):
     def load_config(self):
         """加载配置文件"""
         config_path = Path(__file__).parent.parent / "backend" / "config.json"
+        if not config_path.is_file():
+            print(f"配置文件不存在: {config_path}")
+            return {}
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"加载配置文件失败: {e}")
+            with open(config_path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            print(f"读取配置文件失败: {e}")
+            return {}
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as e:
+            print(f"解析配置文件失败: {e}")
             return {}
 
     def create_config_section(self, layout, data, prefix=""):
@@ -115,12 +125,16 @@ class ConfigPage(QWidget):
 
         # 保存到文件
         config_path = Path(__file__).parent.parent / "backend" / "config.json"
+        # 先写入临时文件再原子替换，避免写入中断时留下不完整的配置文件
+        tmp_path = config_path.with_suffix('.json.tmp')
         try:
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(new_config, f, indent=2, ensure_ascii=False)
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(new_config, option=orjson.OPT_INDENT_2))
+            os.replace(tmp_path, config_path)
             print("配置已保存")
         except Exception as e:
             print(f"保存配置失败: {e}")
+            tmp_path.unlink(missing_ok=True)
 
     def collect_config_data(self, original, prefix):
         """从控件收集配置数据"""
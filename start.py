@@ -40,7 +40,7 @@ if str(app_dir) not in sys.path:
     sys.path.insert(0, str(app_dir))
 
 # 导入主应用
-from main import create_app
+from main import create_app, UVICORN_SERVER_OPTIONS
 
 if __name__ == "__main__":
     import argparse
@@ -130,5 +130,6 @@ API文档:
         app,
         host=args.host,
         port=args.port,
-        log_level="info"
+        log_level="info",
+        **UVICORN_SERVER_OPTIONS,
     )
\ No newline at end of file